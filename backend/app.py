@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 from ultralytics import YOLO
 import cv2
 import numpy as np
@@ -8,11 +9,25 @@ import uuid
 from PIL import Image
 import io
 import base64
-from pathlib import Path
 import shutil
+import atexit
+
+import archive
+import cameras
+import cascade
+import database
+import events
+import idempotency
+import profiling
+import resources
+import run_registry
+import tracking
+import weight_estimation
 
 app = Flask(__name__)
 CORS(app)
+# Uploads are read into memory before the frame budget applies, so cap their size
+app.config['MAX_CONTENT_LENGTH'] = int(resources.MAX_UPLOAD_MB * 2 ** 20)
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
@@ -25,21 +40,11 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(ANNOTATED_FOLDER, exist_ok=True)
 os.makedirs(CAMERA_CAPTURES_FOLDER, exist_ok=True)
 
-# Load the trained YOLO model (with fallback to latest run)
-def _latest_fruit_run_dir():
-    runs_dir = Path('runs') / 'detect'
-    if not runs_dir.exists():
-        return None
-    run_dirs = [d for d in runs_dir.iterdir() if d.is_dir() and d.name.startswith('fruit-detection')]
-    if not run_dirs:
-        return None
-    def run_index(p: Path) -> int:
-        suffix = p.name.replace('fruit-detection', '')
-        return int(suffix) if suffix.isdigit() else 0
-    # Prefer highest numeric suffix; break ties by most recent mtime
-    run_dirs.sort(key=run_index)
-    return max(run_dirs, key=lambda p: p.stat().st_mtime)
+# Pin torch/OpenCV thread pools before any model is loaded
+resources.configure()
+frame_budget = resources.FrameBudget()
 
+# Load the trained YOLO model (with fallback to latest run)
 def load_model_with_fallback():
     # 1) Try models/best.pt
     if os.path.exists(MODEL_PATH):
@@ -50,21 +55,20 @@ def load_model_with_fallback():
         except Exception as e:
             print(f"Primary model load failed from {MODEL_PATH}: {e}")
 
-    # 2) Try latest run's best.pt (or last.pt)
-    latest_dir = _latest_fruit_run_dir()
-    if latest_dir is not None:
-        best_path = latest_dir / 'weights' / 'best.pt'
-        last_path = latest_dir / 'weights' / 'last.pt'
-        chosen = best_path if best_path.exists() else (last_path if last_path.exists() else None)
-        if chosen is not None:
+    # 2) Try the best registered run's best.pt (or last.pt), then the latest run
+    entry = run_registry.get_run('best') or run_registry.get_run('latest')
+    if entry is not None:
+        chosen = run_registry.weights_path(entry)
+        if chosen is not None and chosen.exists():
             try:
-                print(f"Loading model from latest run: {chosen.as_posix()}")
+                print(f"Loading model from registered run {entry['name']}: {chosen.as_posix()}")
                 m = YOLO(str(chosen))
                 # Copy for future startups
                 try:
                     os.makedirs('models', exist_ok=True)
                     shutil.copy2(str(chosen), MODEL_PATH)
                     print(f"Copied {chosen.as_posix()} to {MODEL_PATH}")
+                    run_registry.mark_promoted(entry['name'])
                 except Exception as copy_err:
                     print(f"Warning: could not copy to {MODEL_PATH}: {copy_err}")
                 return m
@@ -77,6 +81,22 @@ def load_model_with_fallback():
 
 model = load_model_with_fallback()
 
+# Optional small screening model for cascade / ensemble inference
+def load_screen_model():
+    if not os.path.exists(cascade.SCREEN_MODEL_PATH):
+        if cascade.CASCADE_MODE != 'single':
+            print(f"Screening model not found at {cascade.SCREEN_MODEL_PATH}")
+        return None
+    try:
+        m = YOLO(cascade.SCREEN_MODEL_PATH)
+        print(f"Screening model loaded from {cascade.SCREEN_MODEL_PATH}")
+        return m
+    except Exception as e:
+        print(f"Screening model load failed from {cascade.SCREEN_MODEL_PATH}: {e}")
+        return None
+
+screen_model = load_screen_model()
+
 # Class names for fruit detection (matching data.yaml)
 CLASS_NAMES = [
     "apple", "tangerine", "pear", "watermelon", "durian", 
@@ -142,6 +162,115 @@ def process_detections(results):
     
     return detections, class_counts
 
+detector = cascade.CascadeDetector(model, screen=screen_model, process_fn=process_detections,
+                                   class_names=CLASS_NAMES)
+
+# Detection boxes -> estimated kilograms (per-class tables + camera calibration)
+weight_estimator = weight_estimation.WeightEstimator(CLASS_NAMES)
+
+# Per-camera object trackers (optional) so each item is counted once
+trackers = tracking.TrackerRegistry()
+database.init_db()
+
+# Camera fleet: in-memory heartbeats, frame budgets and fair inference scheduling
+camera_registry = cameras.CameraRegistry()
+camera_registry.load()
+camera_registry.start()
+atexit.register(camera_registry.stop)
+scheduler = cameras.FairScheduler()
+upload_limiter = cameras.ClientRateLimiter()
+
+def upload_queue_id():
+    """Scheduler queue for manual uploads: one per client, so dashboard users do not share a queue"""
+    return f"upload:{request.remote_addr}"
+
+def detect_scheduled(queue_id, image, mode=None):
+    """Run detection once the fair scheduler grants queue_id an inference slot"""
+    max_queued = cameras.UPLOAD_MAX_QUEUED if queue_id.startswith('upload:') else None
+    if not scheduler.acquire(queue_id, max_queued=max_queued):
+        return None
+    g.trace.lap('queue_wait')
+    try:
+        return detector.detect(image, mode=mode)
+    finally:
+        g.trace.lap('inference')
+        scheduler.release()
+
+# Live updates for the dashboard, forwarded to the SSE event server (python events.py)
+event_publisher = events.EventPublisher()
+
+def publish_detection(source, detections, class_counts, tracking_data=None):
+    """Broadcast a detection and the metrics delta it causes"""
+    camera_id = tracking_data['camera_id'] if tracking_data else None
+    event_publisher.publish('detection', {
+        'source': source,
+        'camera_id': camera_id,
+        'total_detections': len(detections),
+        'class_counts': class_counts,
+        'estimated_total_kg': sum(d.get('estimated_kg', 0.0) for d in detections),
+        'new_items': tracking_data['new_items'] if tracking_data else None,
+    })
+    # With tracking only new items count towards the metrics
+    counted = tracking_data['new_items'] if tracking_data is not None else detections
+    if counted:
+        delta_counts = cascade.count_classes(counted)
+        event_publisher.publish('metrics', {
+            'total_detections': sum(delta_counts.values()),
+            'total_waste_kg': sum(d.get('estimated_kg') or 0.0 for d in counted),
+            'class_counts': delta_counts,
+        })
+
+# Profiling: per-stage request traces, slow-request ring buffer, on-demand sampler
+profiler = profiling.SamplingProfiler()
+slow_requests = profiling.SlowRequestLog()
+UNTRACED_PATHS = {'/api/admin/profile'}
+
+@app.before_request
+def start_trace():
+    g.trace = profiling.RequestTrace(request.path)
+
+@app.after_request
+def record_trace(response):
+    trace = g.get('trace')
+    if trace is not None and request.path not in UNTRACED_PATHS:
+        if trace.stages:
+            trace.lap('response')
+        slow_requests.record(trace, response.status_code)
+    return response
+
+# Idempotent uploads: retried/duplicated requests replay the stored response
+idempotency_store = idempotency.IdempotencyStore()
+idempotency_store.init_db()
+
+def store_blob(folder, filename, data):
+    """Write data once; later requests with the same content reuse the file"""
+    path = os.path.join(folder, filename)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return path
+
+def annotated_response(annotated_path, annotated_bytes=None):
+    """data: URL of the annotated image for the frontend"""
+    if annotated_bytes is None:
+        with open(annotated_path, 'rb') as img_file:
+            annotated_bytes = img_file.read()
+    return f"data:image/jpeg;base64,{base64.b64encode(annotated_bytes).decode('utf-8')}"
+
+def replay_response(stored, image_hash):
+    """Rebuild a stored response (the image is kept on disk, not in the store)"""
+    response_data = dict(stored)
+    # An Idempotency-Key reused with a different image must not replay the other image's result
+    if response_data.pop('image_sha256', image_hash) != image_hash:
+        return jsonify({'success': False,
+                        'error': 'Idempotency-Key was already used with a different image'}), 422
+    annotated_path = response_data.pop('annotated_path')
+    response_data['annotated_image_url'] = annotated_response(annotated_path)
+    response_data['idempotent_replay'] = True
+    return jsonify(response_data)
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Handle image upload and run YOLO detection"""
@@ -154,63 +283,171 @@ def predict():
         if file.filename == '':
             return jsonify({'success': False, 'error': 'No image file selected'}), 400
         
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        
-        # Save uploaded image
-        file.save(filepath)
+        mode = request.args.get('mode')
+        if mode is not None and mode not in cascade.MODES:
+            return jsonify({'success': False, 'error': f'Unknown inference mode: {mode}'}), 400
         
-        # Load image for processing
-        image = cv2.imread(filepath)
-        if image is None:
-            return jsonify({'success': False, 'error': 'Invalid image file'}), 400
+        # Retries and duplicate uploads replay the stored response
+        image_bytes = file.read()
+        image_hash = idempotency.content_hash(image_bytes)
+        g.trace.meta.update(filename=file.filename, bytes=len(image_bytes), sha256=image_hash[:16], mode=mode)
+        g.trace.lap('read_upload')
+        key = idempotency.request_key(request, f"predict:{mode or ''}", image_hash)
+        stored = idempotency_store.begin(key)
+        g.trace.lap('idempotency_lookup')
+        if stored is not None:
+            return replay_response(stored, image_hash)
         
-        # Run YOLO detection
-        results = model(image)
-        
-        # Process detection results
-        detections, class_counts = process_detections(results)
-        
-        # Draw detections on image
-        annotated_image = draw_detections(image, detections)
-        
-        # Save annotated image
-        annotated_filename = f"annotated_{filename}"
-        annotated_filepath = os.path.join(ANNOTATED_FOLDER, annotated_filename)
-        cv2.imwrite(annotated_filepath, annotated_image)
-        
-        # Convert annotated image to base64 for frontend display
-        with open(annotated_filepath, 'rb') as img_file:
-            img_data = base64.b64encode(img_file.read()).decode('utf-8')
-        
-        # Clean up uploaded file
-        os.remove(filepath)
-        
-        # Prepare response
-        response_data = {
-            'success': True,
-            'detections': detections,
-            'annotated_image_url': f"data:image/jpeg;base64,{img_data}",
-            'total_detections': len(detections),
-            'class_counts': class_counts
-        }
-        
-        return jsonify(response_data)
+        reserved = 0
+        try:
+            # Per-client budget for manual uploads
+            if not upload_limiter.allow(upload_queue_id()):
+                return jsonify({'success': False, 'error': 'Upload rate limit exceeded, try again'}), 429
+            g.trace.lap('rate_limit')
+            
+            # Bound the memory held by compressed + decoded frames in flight
+            frame_cost = resources.frame_cost(image_bytes)
+            if frame_cost is None:
+                return jsonify({'success': False, 'error': 'Invalid image file'}), 400
+            if frame_cost > frame_budget.limit:
+                return jsonify({'success': False, 'error': 'Image dimensions too large'}), 413
+            if not frame_budget.reserve(frame_cost):
+                return jsonify({'success': False, 'error': 'Server busy, try again'}), 503
+            reserved = frame_cost
+            g.trace.lap('frame_budget')
+            
+            # Decode the upload in memory (nothing is kept in the uploads folder)
+            image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return jsonify({'success': False, 'error': 'Invalid image file'}), 400
+            g.trace.meta.update(height=image.shape[0], width=image.shape[1])
+            g.trace.lap('decode')
+            
+            # Run YOLO detection (single model, cascade or ensemble)
+            result = detect_scheduled(upload_queue_id(), image, mode=mode)
+            if result is None:
+                return jsonify({'success': False, 'error': 'Server busy, try again'}), 503
+            detections, class_counts, inference_info = result
+            estimated_total_kg = weight_estimator.annotate(detections)
+            g.trace.lap('weight_estimation')
+            
+            # Draw detections on image
+            annotated_image = draw_detections(image, detections)
+            g.trace.lap('draw_detections')
+            
+            # Save annotated image, named by its own content since boxes depend on mode and model
+            annotated_bytes = cv2.imencode('.jpg', annotated_image)[1].tobytes()
+            g.trace.lap('jpeg_encode')
+            annotated_name = f"annotated_{idempotency.content_hash(annotated_bytes)[:16]}.jpg"
+            annotated_path = store_blob(ANNOTATED_FOLDER, annotated_name, annotated_bytes)
+            g.trace.lap('disk_write')
+            
+            publish_detection('upload', detections, class_counts)
+            g.trace.lap('publish')
+            
+            # Prepare response
+            response_data = {
+                'success': True,
+                'detections': detections,
+                'total_detections': len(detections),
+                'class_counts': class_counts,
+                'estimated_total_kg': estimated_total_kg,
+                'inference': inference_info
+            }
+            idempotency_store.complete(key, dict(response_data, annotated_path=annotated_path, image_sha256=image_hash))
+            g.trace.lap('idempotency_store')
+            
+            response_data['annotated_image_url'] = annotated_response(annotated_path, annotated_bytes)
+            g.trace.lap('base64_encode')
+            return jsonify(response_data)
+        finally:
+            frame_budget.release(reserved)
+            idempotency_store.release(key)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error during prediction: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({'success': False, 'error': f'Upload exceeds {resources.MAX_UPLOAD_MB:g} MB'}), 413
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'model_loaded': model is not None,
+        'inference_mode': detector.mode,
+        'resources': dict(resources.state(), inference=scheduler.state(), frames=frame_budget.state()),
+        'events': event_publisher.stats(),
         'class_names': CLASS_NAMES
     })
 
+@app.route('/api/cameras', methods=['GET'])
+def camera_list():
+    """Camera fleet status served from the in-memory registry"""
+    return jsonify({'cameras': camera_registry.snapshot(), 'scheduler': scheduler.state(),
+                    'uploads': upload_limiter.state()})
+
+@app.route('/api/analytics/class-trends', methods=['GET'])
+def class_trends():
+    """Per-class detection counts per day/hour from the archive and recent rows"""
+    try:
+        counts = archive.query_class_counts(request.args['start'], request.args['end'],
+                                            camera_id=request.args.get('camera_id'),
+                                            bucket=request.args.get('bucket', 'day'))
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid query: {e}'}), 400
+    return jsonify({'success': True, 'counts': counts})
+
+@app.route('/api/analytics/cameras', methods=['GET'])
+def camera_analytics():
+    """Per-camera, per-class detection counts for the location heatmap"""
+    try:
+        counts = archive.query_camera_counts(request.args['start'], request.args['end'])
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid query: {e}'}), 400
+    return jsonify({'success': True, 'cameras': counts})
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Run the sampling profiler for N seconds and return folded stacks (admin only)"""
+    if not profiling.is_admin(request):
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    try:
+        seconds = float(request.args.get('seconds', '10'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid seconds'}), 400
+    result = profiler.run(seconds)
+    if result is None:
+        return jsonify({'success': False, 'error': 'A profile is already running'}), 409
+    folded, samples = result
+    return Response(folded, mimetype='text/plain', headers={'X-Profile-Samples': str(samples)})
+
+@app.route('/api/admin/slow-requests', methods=['GET'])
+def admin_slow_requests():
+    """Stage traces of the most recent slow requests (admin only)"""
+    if not profiling.is_admin(request):
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    return jsonify({
+        'threshold_ms': slow_requests.threshold_ms,
+        'recorded': slow_requests.recorded,
+        'requests': slow_requests.entries(),
+    })
+
+@app.route('/api/tracking', methods=['GET'])
+def tracking_state():
+    """Per-camera tracker state"""
+    return jsonify({'enabled': tracking.TRACKING_ENABLED, 'cameras': trackers.state()})
+
+@app.route('/api/cascade/stats', methods=['GET'])
+def cascade_stats():
+    """Cascade escalation statistics for tuning the thresholds"""
+    return jsonify(detector.stats())
+
 @app.route('/api/classes', methods=['GET'])
 def get_classes():
     """Get available class names"""
@@ -231,54 +468,121 @@ def camera_capture():
         if file.filename == '':
             return jsonify({'success': False, 'error': 'No image file selected'}), 400
         
-        # Generate unique filename with timestamp
-        timestamp = request.form.get('timestamp', '')
-        if timestamp:
-            filename = f"camera_capture_{timestamp}_{uuid.uuid4().hex[:8]}.jpg"
-        else:
-            filename = f"camera_capture_{uuid.uuid4()}.jpg"
-        
-        filepath = os.path.join(CAMERA_CAPTURES_FOLDER, filename)
+        mode = request.args.get('mode')
+        if mode is not None and mode not in cascade.MODES:
+            return jsonify({'success': False, 'error': f'Unknown inference mode: {mode}'}), 400
         
-        # Save captured image
-        file.save(filepath)
+        # Without a camera_id this is a manual capture from the dashboard: no tracking,
+        # and it is rate limited and queued like an upload
+        camera_id = request.form.get('camera_id') or None
+        g.trace.meta['camera_id'] = camera_id
+        track = camera_id is not None and request.form.get('track', '1' if tracking.TRACKING_ENABLED else '0') == '1'
         
-        # Load image for processing
-        image = cv2.imread(filepath)
-        if image is None:
-            return jsonify({'success': False, 'error': 'Invalid image file'}), 400
+        # Retries and duplicate frames replay the stored response
+        image_bytes = file.read()
+        image_hash = idempotency.content_hash(image_bytes)
+        g.trace.meta.update(filename=file.filename, bytes=len(image_bytes), sha256=image_hash[:16], mode=mode)
+        g.trace.lap('read_upload')
+        # Heartbeat first: a camera resending an unchanged frame gets a replay but is still online
+        if camera_id is not None and not camera_registry.touch(camera_id, request.form.get('location')):
+            return jsonify({'success': False, 'error': f'Unknown camera: {camera_id}'}), 403
+        key = idempotency.request_key(request, f"camera-capture:{mode or ''}", image_hash)
+        stored = idempotency_store.begin(key)
+        g.trace.lap('idempotency_lookup')
+        if stored is not None:
+            return replay_response(stored, image_hash)
         
-        # Run YOLO detection
-        results = model(image)
-        
-        # Process detection results
-        detections, class_counts = process_detections(results)
-        
-        # Draw detections on image
-        annotated_image = draw_detections(image, detections)
-        
-        # Save annotated image
-        annotated_filename = f"annotated_{filename}"
-        annotated_filepath = os.path.join(ANNOTATED_FOLDER, annotated_filename)
-        cv2.imwrite(annotated_filepath, annotated_image)
-        
-        # Convert annotated image to base64 for frontend display
-        with open(annotated_filepath, 'rb') as img_file:
-            img_data = base64.b64encode(img_file.read()).decode('utf-8')
-        
-        # Prepare response
-        response_data = {
-            'success': True,
-            'detections': detections,
-            'annotated_image_url': f"data:image/jpeg;base64,{img_data}",
-            'total_detections': len(detections),
-            'class_counts': class_counts,
-            'saved_path': filepath,
-            'message': f'Image saved to {CAMERA_CAPTURES_FOLDER} folder'
-        }
-        
-        return jsonify(response_data)
+        reserved = 0
+        try:
+            # Heartbeat + per-camera frame budget, or the client's upload budget for manual captures
+            if camera_id is not None:
+                admitted = camera_registry.admit(camera_id, request.form.get('location'))
+                if admitted is None:
+                    return jsonify({'success': False, 'error': f'Unknown camera: {camera_id}'}), 403
+                if not admitted:
+                    return jsonify({'success': False, 'error': 'Frame rate limit exceeded for this camera'}), 429
+            elif not upload_limiter.allow(upload_queue_id()):
+                return jsonify({'success': False, 'error': 'Upload rate limit exceeded, try again'}), 429
+            g.trace.lap('rate_limit')
+            
+            # Bound the memory held by compressed + decoded frames in flight
+            frame_cost = resources.frame_cost(image_bytes)
+            if frame_cost is None:
+                return jsonify({'success': False, 'error': 'Invalid image file'}), 400
+            if frame_cost > frame_budget.limit:
+                return jsonify({'success': False, 'error': 'Image dimensions too large'}), 413
+            if not frame_budget.reserve(frame_cost):
+                return jsonify({'success': False, 'error': 'Server busy, try again'}), 503
+            reserved = frame_cost
+            g.trace.lap('frame_budget')
+            
+            # Load image for processing
+            image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return jsonify({'success': False, 'error': 'Invalid image file'}), 400
+            g.trace.meta.update(height=image.shape[0], width=image.shape[1])
+            g.trace.lap('decode')
+            
+            # Save captured image, stored once by content hash
+            filename = f"camera_capture_{image_hash[:16]}.jpg"
+            filepath = store_blob(CAMERA_CAPTURES_FOLDER, filename, image_bytes)
+            g.trace.lap('disk_write_capture')
+            
+            # Run YOLO detection (single model, cascade or ensemble)
+            result = detect_scheduled(camera_id or upload_queue_id(), image, mode=mode)
+            if result is None:
+                return jsonify({'success': False, 'error': 'Server busy, try again'}), 503
+            detections, class_counts, inference_info = result
+            estimated_total_kg = weight_estimator.annotate(detections, camera_id)
+            g.trace.lap('weight_estimation')
+            
+            # Track items across frames and persist each new item once
+            tracking_data = None
+            if track:
+                tracked, new_items = trackers.update(camera_id, detections)
+                database.record_item_events(new_items)
+                tracking_data = {'camera_id': camera_id, 'tracked': tracked, 'new_items': new_items}
+                g.trace.lap('tracking')
+            publish_detection('camera', detections, class_counts, tracking_data)
+            if camera_id is not None:
+                camera_registry.add_detections(camera_id, len(tracking_data['new_items']) if tracking_data else len(detections))
+            g.trace.lap('publish')
+            
+            # Draw detections on image
+            annotated_image = draw_detections(image, detections)
+            g.trace.lap('draw_detections')
+            
+            # Save annotated image, named by its own content since boxes depend on mode and model
+            annotated_bytes = cv2.imencode('.jpg', annotated_image)[1].tobytes()
+            g.trace.lap('jpeg_encode')
+            annotated_name = f"annotated_camera_capture_{idempotency.content_hash(annotated_bytes)[:16]}.jpg"
+            annotated_path = store_blob(ANNOTATED_FOLDER, annotated_name, annotated_bytes)
+            g.trace.lap('disk_write')
+            
+            # Prepare response
+            response_data = {
+                'success': True,
+                'detections': detections,
+                'total_detections': len(detections),
+                'class_counts': class_counts,
+                'estimated_total_kg': estimated_total_kg,
+                'inference': inference_info,
+                'tracking': tracking_data,
+                'saved_path': filepath,
+                'message': f'Image saved to {CAMERA_CAPTURES_FOLDER} folder'
+            }
+            idempotency_store.complete(key, dict(response_data, annotated_path=annotated_path, image_sha256=image_hash))
+            g.trace.lap('idempotency_store')
+            
+            response_data['annotated_image_url'] = annotated_response(annotated_path, annotated_bytes)
+            g.trace.lap('base64_encode')
+            return jsonify(response_data)
+        finally:
+            frame_budget.release(reserved)
+            idempotency_store.release(key)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error during camera capture: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Columnar archive for historical detections.
+
+compact() moves detections rows older than a cutoff out of detections.db
+into day partitions of plain .npy column files:
+
+    archive/detections/<YYYY-MM-DD>/part-<N>/
+        frame_id.npy (int64)  timestamp.npy (int64, epoch s)
+        camera.npy (int16, index into cameras.json)  processing_time.npy (float32)
+        box_frame.npy (int32, index into the frame columns)
+        class_id.npy (int16)  confidence.npy (float16)  bbox.npy (int16, N x 4)
+
+class_counts_json is not stored since it is derived from the box columns.
+The query functions memory-map the partitions of the requested date range
+and aggregate with np.bincount; rows still in SQLite are converted to the
+same columns on the fly so results cover the full history. Each day's rows
+are deleted from SQLite as soon as its partition is in place, and live rows
+whose id is already archived are skipped, so an interrupted compaction never
+counts a detection twice.
+
+Usage:
+    python archive.py compact --older-than 30
+    python archive.py query --start 2025-09-01 --end 2025-10-01 [--camera cam_001] [--bucket hour]
+    python archive.py benchmark --frames 200000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+import database
+
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', 'archive')) / 'detections'
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '30'))
+
+# Class names for fruit detection (matching data.yaml)
+CLASS_NAMES = [
+    "apple", "tangerine", "pear", "watermelon", "durian",
+    "lemon", "grape", "pineapple", "dragon fruit", "korean melon", "cantaloupe"
+]
+
+_FRAME_COLUMNS = ('frame_id', 'timestamp', 'camera', 'processing_time')
+_BOX_COLUMNS = ('box_frame', 'class_id', 'confidence', 'bbox')
+_DB_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _parse_time(value):
+    return int(datetime.strptime(value[:19], _DB_TIME_FORMAT).timestamp())
+
+
+def rows_to_columns(rows):
+    """Convert detections rows (id, timestamp, camera_id, detections_json, processing_time) to columns"""
+    cameras = []
+    camera_index = {}
+    frame_id, timestamp, camera, processing_time = [], [], [], []
+    box_frame, class_id, confidence, bbox = [], [], [], []
+    for i, (row_id, ts, camera_id, detections_json, proc_time) in enumerate(rows):
+        camera_id = camera_id or ''
+        if camera_id not in camera_index:
+            camera_index[camera_id] = len(cameras)
+            cameras.append(camera_id)
+        frame_id.append(row_id)
+        timestamp.append(_parse_time(ts))
+        camera.append(camera_index[camera_id])
+        processing_time.append(proc_time or 0.0)
+        for d in json.loads(detections_json or '[]'):
+            box_frame.append(i)
+            class_id.append(d['class_id'])
+            confidence.append(d['confidence'])
+            bbox.append(d['bbox'])
+    columns = {
+        'frame_id': np.array(frame_id, dtype=np.int64),
+        'timestamp': np.array(timestamp, dtype=np.int64),
+        'camera': np.array(camera, dtype=np.int16),
+        'processing_time': np.array(processing_time, dtype=np.float32),
+        'box_frame': np.array(box_frame, dtype=np.int32),
+        'class_id': np.array(class_id, dtype=np.int16),
+        'confidence': np.array(confidence, dtype=np.float16),
+        'bbox': np.clip(np.array(bbox, dtype=np.int64).reshape(-1, 4), -32768, 32767).astype(np.int16),
+    }
+    return columns, cameras
+
+
+def _select_rows(conn, where, params):
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(detections)')}
+    camera_expr = 'camera_id' if 'camera_id' in columns else "''"
+    return conn.execute(f'SELECT id, timestamp, {camera_expr}, detections_json, processing_time '
+                        f'FROM detections WHERE {where} ORDER BY id', params).fetchall()
+
+
+def _write_partition(day, columns, cameras):
+    day_dir = ARCHIVE_DIR / day
+    day_dir.mkdir(parents=True, exist_ok=True)
+    part = len([p for p in day_dir.iterdir() if p.name.startswith('part-')])
+    tmp_dir = day_dir / f".tmp-part-{part:04d}"
+    tmp_dir.mkdir(exist_ok=True)
+    for name, values in columns.items():
+        np.save(tmp_dir / f"{name}.npy", values)
+    with open(tmp_dir / 'cameras.json', 'w') as f:
+        json.dump(cameras, f)
+    part_dir = day_dir / f"part-{part:04d}"
+    os.replace(tmp_dir, part_dir)
+    return part_dir
+
+
+def _day_partitions(day_dir):
+    if not day_dir.is_dir():
+        return []
+    return [part for part in sorted(day_dir.iterdir()) if part.name.startswith('part-')]
+
+
+def _archived_ids(part_dirs):
+    """frame ids already written to the given partitions"""
+    ids = [np.load(part / 'frame_id.npy', mmap_mode='r') for part in part_dirs]
+    return np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+
+
+def compact(older_than_days=None):
+    """Move detections older than the cutoff into day partitions; returns rows archived"""
+    older_than_days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime(_DB_TIME_FORMAT)
+    with database.connect() as conn:
+        rows = _select_rows(conn, 'timestamp < ?', (cutoff,))
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row[1][:10], []).append(tuple(row))
+    archived = 0
+    for day, day_rows in sorted(by_day.items()):
+        # Rows written by an interrupted earlier run only need deleting
+        done = np.isin([r[0] for r in day_rows], _archived_ids(_day_partitions(ARCHIVE_DIR / day)))
+        pending = [row for row, is_done in zip(day_rows, done) if not is_done]
+        if pending:
+            columns, cameras = rows_to_columns(pending)
+            _write_partition(day, columns, cameras)
+        # Commit per day, so a failure on a later day cannot roll back this delete
+        with database.connect() as conn:
+            conn.executemany('DELETE FROM detections WHERE id = ?', [(r[0],) for r in day_rows])
+        archived += len(day_rows)
+    return archived
+
+
+def _partition_dirs(start, end):
+    if not ARCHIVE_DIR.exists():
+        return []
+    first, last = start.isoformat(), end.isoformat()
+    return [part for day_dir in sorted(ARCHIVE_DIR.iterdir())
+            if first <= day_dir.name <= last
+            for part in _day_partitions(day_dir)]
+
+
+def _load_partition(part_dir):
+    columns = {name: np.load(part_dir / f"{name}.npy", mmap_mode='r')
+               for name in _FRAME_COLUMNS + _BOX_COLUMNS}
+    with open(part_dir / 'cameras.json') as f:
+        cameras = json.load(f)
+    return columns, cameras
+
+
+def _iter_chunks(start, end, include_live=True):
+    """(columns, cameras) for every archive partition and the live SQLite rows in range"""
+    part_dirs = _partition_dirs(start, end)
+    for part_dir in part_dirs:
+        yield _load_partition(part_dir)
+    if include_live:
+        with database.connect() as conn:
+            rows = _select_rows(conn, 'timestamp >= ? AND timestamp < ?',
+                                (start.isoformat(), (end + timedelta(days=1)).isoformat()))
+        if rows:
+            # Skip rows an interrupted compaction archived but did not delete
+            archived = np.isin([r[0] for r in rows], _archived_ids(part_dirs))
+            rows = [tuple(r) for r, is_archived in zip(rows, archived) if not is_archived]
+        if rows:
+            yield rows_to_columns(rows)
+
+
+def _to_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+# bucket -> (seconds, label format)
+_BUCKETS = {'day': (86400, '%Y-%m-%d'), 'hour': (3600, '%Y-%m-%d %H:00')}
+
+
+def query_class_counts(start, end, camera_id=None, bucket='day', include_live=True):
+    """
+    Per-class detection counts per time bucket ('day' or 'hour').
+
+    Returns {bucket_label: {class_name: count}} for start..end inclusive.
+    """
+    if bucket not in _BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    bucket_seconds, fmt = _BUCKETS[bucket]
+    start, end = _to_date(start), _to_date(end)
+    lo = int(datetime.combine(start, datetime.min.time()).timestamp())
+    hi = int(datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp())
+    n_buckets = max(1, (hi - lo + bucket_seconds - 1) // bucket_seconds)
+    n_classes = len(CLASS_NAMES) + 1  # last slot collects unknown class ids
+    totals = np.zeros(n_buckets * n_classes, dtype=np.int64)
+
+    for columns, cameras in _iter_chunks(start, end, include_live):
+        frame_ts = np.asarray(columns['timestamp'])
+        keep_frame = (frame_ts >= lo) & (frame_ts < hi)
+        if camera_id is not None:
+            if camera_id not in cameras:
+                continue
+            keep_frame &= np.asarray(columns['camera']) == cameras.index(camera_id)
+        box_frame = np.asarray(columns['box_frame'])
+        if box_frame.size == 0:
+            continue
+        keep = keep_frame[box_frame]
+        cls = np.asarray(columns['class_id'])[keep].astype(np.int64)
+        cls = np.where((cls >= 0) & (cls < len(CLASS_NAMES)), cls, len(CLASS_NAMES))
+        bucket_idx = (frame_ts[box_frame[keep]] - lo) // bucket_seconds
+        totals += np.bincount(bucket_idx * n_classes + cls, minlength=totals.size)
+
+    totals = totals.reshape(n_buckets, n_classes)
+    result = {}
+    for b in np.nonzero(totals.sum(axis=1))[0]:
+        label = datetime.fromtimestamp(lo + int(b) * bucket_seconds).strftime(fmt)
+        result[label] = {name: int(totals[b, c]) for c, name in enumerate(CLASS_NAMES + ['unknown'])
+                         if totals[b, c]}
+    return result
+
+
+def query_camera_counts(start, end, include_live=True):
+    """Detections per camera and class over start..end (for the location heatmap)"""
+    start, end = _to_date(start), _to_date(end)
+    lo = int(datetime.combine(start, datetime.min.time()).timestamp())
+    hi = int(datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp())
+    n_classes = len(CLASS_NAMES) + 1
+    result = {}
+    for columns, cameras in _iter_chunks(start, end, include_live):
+        box_frame = np.asarray(columns['box_frame'])
+        if box_frame.size == 0:
+            continue
+        frame_ts = np.asarray(columns['timestamp'])
+        keep = ((frame_ts >= lo) & (frame_ts < hi))[box_frame]
+        cam = np.asarray(columns['camera'])[box_frame[keep]].astype(np.int64)
+        cls = np.asarray(columns['class_id'])[keep].astype(np.int64)
+        cls = np.where((cls >= 0) & (cls < len(CLASS_NAMES)), cls, len(CLASS_NAMES))
+        counts = np.bincount(cam * n_classes + cls, minlength=len(cameras) * n_classes)
+        counts = counts.reshape(len(cameras), n_classes)
+        for i, camera_id in enumerate(cameras):
+            entry = result.setdefault(camera_id or 'unknown', {})
+            for c, name in enumerate(CLASS_NAMES + ['unknown']):
+                if counts[i, c]:
+                    entry[name] = entry.get(name, 0) + int(counts[i, c])
+    return result
+
+
+def _directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+def benchmark(frames=200000, boxes_per_frame=3, days=90, cameras=8):
+    """Compare size and query time of SQLite JSON rows vs the columnar archive on synthetic data"""
+    global ARCHIVE_DIR
+    rng = np.random.default_rng(0)
+    work_dir = Path(tempfile.mkdtemp(prefix='archive-bench-'))
+    old_db, old_archive = database.DB_PATH, ARCHIVE_DIR
+    database.DB_PATH = str(work_dir / 'bench.db')
+    ARCHIVE_DIR = work_dir / 'archive' / 'detections'
+    try:
+        start_ts = int(datetime.combine(date.today() - timedelta(days=days + 40), datetime.min.time()).timestamp())
+        with database.connect() as conn:
+            conn.execute('''
+                CREATE TABLE detections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    image_filename TEXT,
+                    total_detections INTEGER,
+                    detections_json TEXT,
+                    class_counts_json TEXT,
+                    annotated_image_path TEXT,
+                    processing_time REAL,
+                    camera_id TEXT
+                )
+            ''')
+            rows = []
+            for i in range(frames):
+                ts = start_ts + int(i * days * 86400 / frames)
+                dets = []
+                counts = {}
+                for _ in range(int(rng.integers(0, boxes_per_frame * 2 + 1))):
+                    c = int(rng.integers(0, len(CLASS_NAMES)))
+                    x, y = int(rng.integers(0, 600)), int(rng.integers(0, 600))
+                    dets.append({'class_id': c, 'class_name': CLASS_NAMES[c],
+                                 'confidence': float(rng.random()), 'bbox': [x, y, x + 40, y + 40]})
+                    counts[CLASS_NAMES[c]] = counts.get(CLASS_NAMES[c], 0) + 1
+                rows.append((datetime.fromtimestamp(ts).strftime(_DB_TIME_FORMAT), 'frame.jpg', len(dets),
+                             json.dumps(dets), json.dumps(counts), 'annotated.jpg', 0.05,
+                             f"cam_{int(rng.integers(1, cameras + 1)):03d}"))
+            conn.executemany('INSERT INTO detections (timestamp, image_filename, total_detections, detections_json, '
+                             'class_counts_json, annotated_image_path, processing_time, camera_id) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        db_bytes = os.path.getsize(database.DB_PATH)
+        first_day = date.fromtimestamp(start_ts)
+        last_day = first_day + timedelta(days=days)
+
+        t0 = time.perf_counter()
+        with database.connect() as conn:
+            sql_counts = conn.execute('''
+                SELECT date(timestamp) AS day, json_extract(d.value, '$.class_name') AS cls, COUNT(*)
+                FROM detections, json_each(detections.detections_json) AS d
+                WHERE timestamp >= ? AND timestamp < ?
+                GROUP BY day, cls
+            ''', (first_day.isoformat(), (last_day + timedelta(days=1)).isoformat())).fetchall()
+        sqlite_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        compact(older_than_days=0)
+        compact_s = time.perf_counter() - t0
+        archive_bytes = _directory_size(ARCHIVE_DIR)
+
+        t0 = time.perf_counter()
+        archive_counts = query_class_counts(first_day, last_day, include_live=False)
+        archive_s = time.perf_counter() - t0
+
+        return {
+            'frames': frames,
+            'days': days,
+            'sqlite_bytes': db_bytes,
+            'archive_bytes': archive_bytes,
+            'size_ratio': db_bytes / archive_bytes if archive_bytes else None,
+            'sqlite_query_s': sqlite_s,
+            'archive_query_s': archive_s,
+            'speedup': sqlite_s / archive_s if archive_s else None,
+            'compact_s': compact_s,
+            'results_match': sum(r[2] for r in sql_counts) == sum(sum(v.values()) for v in archive_counts.values()),
+        }
+    finally:
+        database.DB_PATH, ARCHIVE_DIR = old_db, old_archive
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar detection archive")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('compact', help="Archive detections older than N days")
+    p.add_argument('--older-than', type=int, default=ARCHIVE_AFTER_DAYS)
+    p = sub.add_parser('query', help="Per-class counts over a date range")
+    p.add_argument('--start', required=True)
+    p.add_argument('--end', required=True)
+    p.add_argument('--camera', default=None)
+    p.add_argument('--bucket', choices=('day', 'hour'), default='day')
+    p = sub.add_parser('benchmark', help="Compare SQLite JSON rows with the archive on synthetic data")
+    p.add_argument('--frames', type=int, default=200000)
+    p.add_argument('--days', type=int, default=90)
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        archived = compact(args.older_than)
+        print(f"✅ Archived {archived} detection rows to {ARCHIVE_DIR}")
+    elif args.command == 'query':
+        print(json.dumps(query_class_counts(args.start, args.end, args.camera, args.bucket), indent=2))
+    else:
+        report = benchmark(frames=args.frames, days=args.days)
+        print(f"📊 {report['frames']} frames over {report['days']} days")
+        print(f"   SQLite:  {report['sqlite_bytes'] / 1e6:8.1f} MB  query {report['sqlite_query_s']:.3f} s")
+        print(f"   Archive: {report['archive_bytes'] / 1e6:8.1f} MB  query {report['archive_query_s']:.3f} s")
+        print(f"   {report['size_ratio']:.1f}x smaller, {report['speedup']:.1f}x faster "
+              f"(compaction {report['compact_s']:.1f} s, results match: {report['results_match']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Camera fleet registry, per-camera rate limiting and fair inference scheduling.
+
+Heartbeats and detection totals are kept in memory and flushed to the
+camera_status table periodically, so a frame never waits on a database
+write. Every camera gets a token-bucket frame budget, and inference slots
+are handed out round-robin across cameras so one chatty camera cannot
+starve the others. Unknown camera ids are registered on their first frame,
+up to CAMERA_MAX_AUTO_REGISTERED at a time, and dropped again once idle for
+CAMERA_AUTO_EXPIRE_SECONDS. Manual uploads get a token bucket per client.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+import database
+
+CAMERA_MAX_FPS = float(os.environ.get('CAMERA_MAX_FPS', '2'))
+CAMERA_BURST = float(os.environ.get('CAMERA_BURST', '4'))
+CAMERA_OFFLINE_SECONDS = float(os.environ.get('CAMERA_OFFLINE_SECONDS', '120'))
+CAMERA_FLUSH_SECONDS = float(os.environ.get('CAMERA_FLUSH_SECONDS', '30'))
+INFERENCE_SLOTS = int(os.environ.get('INFERENCE_SLOTS', '2'))
+CAMERA_MAX_QUEUED = int(os.environ.get('CAMERA_MAX_QUEUED', '2'))
+# Cameras that register themselves with their first frame; 0 rejects unknown camera ids
+CAMERA_MAX_AUTO_REGISTERED = int(os.environ.get('CAMERA_MAX_AUTO_REGISTERED', '64'))
+CAMERA_AUTO_EXPIRE_SECONDS = float(os.environ.get('CAMERA_AUTO_EXPIRE_SECONDS', '86400'))
+# Manual uploads (no camera_id) queue per client, with more room than a camera
+UPLOAD_MAX_QUEUED = int(os.environ.get('UPLOAD_MAX_QUEUED', '8'))
+UPLOAD_MAX_FPS = float(os.environ.get('UPLOAD_MAX_FPS', '1'))
+UPLOAD_BURST = float(os.environ.get('UPLOAD_BURST', '5'))
+CAMERA_QUEUE_TIMEOUT = float(os.environ.get('CAMERA_QUEUE_TIMEOUT', '10'))
+
+_DB_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class TokenBucket:
+    """Frame budget: refills at rate tokens per second up to burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ClientRateLimiter:
+    """
+    One token bucket per client. Buckets idle long enough to have refilled
+    are dropped, so memory only grows with the clients active right now.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = UPLOAD_MAX_FPS if rate is None else rate
+        self.burst = UPLOAD_BURST if burst is None else burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic()
+        self.rejected = 0
+
+    def _prune(self, now):
+        refill_seconds = self.burst / self.rate
+        self._buckets = {client_id: bucket for client_id, bucket in self._buckets.items()
+                         if now - bucket.updated < refill_seconds}
+        self._next_prune = now + refill_seconds
+
+    def allow(self, client_id):
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_prune:
+                self._prune(now)
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = TokenBucket(self.rate, self.burst)
+            if bucket.take():
+                return True
+            self.rejected += 1
+            return False
+
+    def state(self):
+        with self._lock:
+            return {'max_fps': self.rate, 'burst': self.burst, 'clients': len(self._buckets),
+                    'rejected': self.rejected}
+
+
+class FairScheduler:
+    """
+    Inference slots granted round-robin across cameras.
+
+    Each queue (a camera, or one client's manual uploads) may have at most
+    max_queued frames waiting; the next free slot always goes to the queue at
+    the head of the rotation, which then moves to the back, so queues are
+    served in turn regardless of how many frames each of them sends.
+    """
+
+    def __init__(self, slots=None, max_queued=None):
+        self.slots = INFERENCE_SLOTS if slots is None else slots
+        self.max_queued = CAMERA_MAX_QUEUED if max_queued is None else max_queued
+        self._free = self.slots
+        self._queues = OrderedDict()  # camera_id -> deque of waiting tickets
+        self._granted = set()
+        self._cond = threading.Condition()
+
+    def _dispatch(self):
+        while self._free > 0 and self._queues:
+            camera_id, queue = next(iter(self._queues.items()))
+            self._granted.add(queue.popleft())
+            self._free -= 1
+            if queue:
+                self._queues.move_to_end(camera_id)
+            else:
+                del self._queues[camera_id]
+        self._cond.notify_all()
+
+    def acquire(self, camera_id, timeout=None, max_queued=None):
+        """Wait for an inference slot; False if the camera's queue is full or the wait timed out"""
+        timeout = CAMERA_QUEUE_TIMEOUT if timeout is None else timeout
+        max_queued = self.max_queued if max_queued is None else max_queued
+        with self._cond:
+            queue = self._queues.get(camera_id)
+            if queue is not None and len(queue) >= max_queued:
+                return False
+            ticket = object()
+            self._queues.setdefault(camera_id, deque()).append(ticket)
+            self._dispatch()
+            if self._cond.wait_for(lambda: ticket in self._granted, timeout):
+                self._granted.discard(ticket)
+                return True
+            queue = self._queues.get(camera_id)
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[camera_id]
+            return False
+
+    def release(self):
+        with self._cond:
+            self._free += 1
+            self._dispatch()
+
+    def state(self):
+        with self._cond:
+            return {
+                'slots': self.slots,
+                'busy': self.slots - self._free,
+                'waiting': {camera_id: len(q) for camera_id, q in self._queues.items()},
+            }
+
+
+class CameraRegistry:
+    """In-memory camera_status with periodic write-back"""
+
+    def __init__(self):
+        self._cameras = {}
+        self._buckets = {}
+        self._dirty = set()
+        self._auto = set()  # auto-registered camera ids, capped and expired
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def load(self):
+        """Populate the registry from camera_status"""
+        with database.connect() as conn:
+            rows = conn.execute('SELECT camera_id, location, status, last_activity, total_detections, '
+                                'auto_registered FROM camera_status').fetchall()
+        with self._lock:
+            for row in rows:
+                last_activity = None
+                if row['last_activity']:
+                    try:
+                        last_activity = datetime.strptime(row['last_activity'], _DB_TIME_FORMAT).timestamp()
+                    except ValueError:
+                        pass
+                self._cameras[row['camera_id']] = {
+                    'camera_id': row['camera_id'],
+                    'location': row['location'],
+                    'status': row['status'],
+                    'last_activity': last_activity,
+                    'total_detections': row['total_detections'] or 0,
+                    'auto_registered': bool(row['auto_registered']),
+                    'frames': 0,
+                    'rejected_frames': 0,
+                }
+                if row['auto_registered']:
+                    self._auto.add(row['camera_id'])
+
+    def _register(self, camera_id):
+        """Auto-register an unknown camera, or None when the cap is reached"""
+        if len(self._auto) >= CAMERA_MAX_AUTO_REGISTERED:
+            return None
+        camera = {'camera_id': camera_id, 'location': None, 'status': 'online', 'last_activity': None,
+                  'total_detections': 0, 'auto_registered': True, 'frames': 0, 'rejected_frames': 0}
+        self._cameras[camera_id] = camera
+        self._auto.add(camera_id)
+        return camera
+
+    def _heartbeat(self, camera_id, location):
+        camera = self._cameras.get(camera_id) or self._register(camera_id)
+        if camera is not None:
+            camera['last_activity'] = time.time()
+            camera['status'] = 'online'
+            if location:
+                camera['location'] = location
+            self._dirty.add(camera_id)
+        return camera
+
+    def touch(self, camera_id, location=None):
+        """Record a heartbeat without spending frame budget; False for an unknown camera that cannot be registered"""
+        with self._lock:
+            return self._heartbeat(camera_id, location) is not None
+
+    def admit(self, camera_id, location=None):
+        """
+        Record a heartbeat and check the camera's frame budget.
+        Returns None for an unknown camera that cannot be registered.
+        """
+        with self._lock:
+            camera = self._heartbeat(camera_id, location)
+            if camera is None:
+                return None
+            bucket = self._buckets.get(camera_id)
+            if bucket is None:
+                bucket = self._buckets[camera_id] = TokenBucket(CAMERA_MAX_FPS, CAMERA_BURST)
+            if bucket.take():
+                camera['frames'] += 1
+                return True
+            camera['rejected_frames'] += 1
+            return False
+
+    def add_detections(self, camera_id, count):
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                return
+            camera['total_detections'] += count
+            self._dirty.add(camera_id)
+
+    def _status(self, camera, now):
+        if camera['last_activity'] is None:
+            return camera['status']
+        return 'online' if now - camera['last_activity'] <= CAMERA_OFFLINE_SECONDS else 'offline'
+
+    def snapshot(self):
+        """Current state of every camera, with offline status derived from last_activity"""
+        now = time.time()
+        with self._lock:
+            cameras = []
+            for camera in self._cameras.values():
+                entry = dict(camera, status=self._status(camera, now))
+                if camera['last_activity'] is not None:
+                    entry['last_activity'] = datetime.fromtimestamp(camera['last_activity']).strftime(_DB_TIME_FORMAT)
+                cameras.append(entry)
+        return sorted(cameras, key=lambda c: c['camera_id'])
+
+    def _expire(self, now):
+        """Forget auto-registered cameras that have been idle too long"""
+        expired = [camera_id for camera_id in self._auto
+                   if now - (self._cameras[camera_id]['last_activity'] or 0) > CAMERA_AUTO_EXPIRE_SECONDS]
+        for camera_id in expired:
+            self._auto.discard(camera_id)
+            self._dirty.discard(camera_id)
+            del self._cameras[camera_id]
+            self._buckets.pop(camera_id, None)
+        return expired
+
+    def flush(self):
+        """Write changed cameras back to camera_status and drop expired ones"""
+        now = time.time()
+        with self._lock:
+            expired = self._expire(now)
+            changed = [dict(self._cameras[c]) for c in self._dirty]
+            # Cameras that have gone quiet need their status written as well
+            for camera in self._cameras.values():
+                status = self._status(camera, now)
+                if status != camera['status']:
+                    camera['status'] = status
+                    if camera['camera_id'] not in self._dirty:
+                        changed.append(dict(camera))
+            self._dirty.clear()
+        if not changed and not expired:
+            return 0
+        rows = [(c['camera_id'], c['location'], self._status(c, now),
+                 datetime.fromtimestamp(c['last_activity']).strftime(_DB_TIME_FORMAT) if c['last_activity'] else None,
+                 c['total_detections'], int(c['auto_registered'])) for c in changed]
+        with database.connect() as conn:
+            conn.executemany('DELETE FROM camera_status WHERE camera_id = ?', [(c,) for c in expired])
+            conn.executemany('''
+                INSERT INTO camera_status (camera_id, location, status, last_activity, total_detections,
+                                           auto_registered)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(camera_id) DO UPDATE SET
+                    location = COALESCE(excluded.location, location),
+                    status = excluded.status,
+                    last_activity = excluded.last_activity,
+                    total_detections = excluded.total_detections,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', rows)
+        return len(rows)
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Warning: camera status flush failed: {e}")
+
+    def start(self, interval=None):
+        """Start the background flush thread"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop,
+                                             args=(interval or CAMERA_FLUSH_SECONDS,), daemon=True)
+            self._flusher.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,191 @@
+"""
+Cascade and ensemble inference for the detection API.
+
+In cascade mode a small screening model (e.g. a fine-tuned yolov8n) runs on
+every frame and only frames whose detections are low-confidence or crowded
+are escalated to the primary model (the yolov8s weights). Ensemble mode runs
+both models and merges their boxes with weighted box fusion; it is slower and
+meant for offline reprocessing. The screening model must be trained on the
+same classes as the primary model.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+CASCADE_MODE = os.environ.get('CASCADE_MODE', 'single')  # single | cascade | ensemble
+SCREEN_MODEL_PATH = os.environ.get('SCREEN_MODEL_PATH', 'models/screen.pt')
+# Escalate when any screening detection is below this confidence...
+ESCALATE_MIN_CONFIDENCE = float(os.environ.get('ESCALATE_MIN_CONFIDENCE', '0.5'))
+# ...or when the frame holds more than this many detections
+ESCALATE_MAX_DETECTIONS = int(os.environ.get('ESCALATE_MAX_DETECTIONS', '8'))
+# Weighted box fusion settings for ensemble mode
+WBF_IOU_THRESHOLD = float(os.environ.get('WBF_IOU_THRESHOLD', '0.55'))
+WBF_WEIGHTS = [float(w) for w in os.environ.get('WBF_WEIGHTS', '1,2').split(',')]  # screen, primary
+
+MODES = ('single', 'cascade', 'ensemble')
+DEFAULT_WBF_WEIGHTS = [1.0, 2.0]
+
+if len(WBF_WEIGHTS) != 2 or any(w < 0 for w in WBF_WEIGHTS) or sum(WBF_WEIGHTS) <= 0:
+    print(f"Warning: WBF_WEIGHTS needs two non-negative weights (screen, primary), "
+          f"got {WBF_WEIGHTS}; using {DEFAULT_WBF_WEIGHTS}")
+    WBF_WEIGHTS = DEFAULT_WBF_WEIGHTS
+
+
+def count_classes(detections):
+    """class_counts dict for a list of detections"""
+    class_counts = {}
+    for detection in detections:
+        class_counts[detection['class_name']] = class_counts.get(detection['class_name'], 0) + 1
+    return class_counts
+
+
+def escalation_reason(detections, min_confidence=None, max_detections=None):
+    """Why a screened frame needs the primary model, or None if it does not"""
+    min_confidence = ESCALATE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    max_detections = ESCALATE_MAX_DETECTIONS if max_detections is None else max_detections
+    if len(detections) > max_detections:
+        return 'crowded'
+    if any(d['confidence'] < min_confidence for d in detections):
+        return 'low_confidence'
+    return None
+
+
+def _iou(box, boxes):
+    tl = np.maximum(box[:2], boxes[:, :2])
+    br = np.minimum(box[2:], boxes[:, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+    area = np.prod(box[2:] - box[:2])
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    return inter / (area + areas - inter + 1e-9)
+
+
+def weighted_box_fusion(detection_lists, weights, class_names, iou_threshold=None):
+    """
+    Fuse detections from several models with weighted box fusion.
+
+    Boxes of the same class that overlap above iou_threshold are clustered and
+    replaced by their confidence-weighted average box. The fused confidence is
+    the model-weighted mean confidence scaled by the share of model weight
+    that voted for the box, so boxes found by only one model are damped.
+    """
+    iou_threshold = WBF_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+    rows = []
+    for model_idx, detections in enumerate(detection_lists):
+        for d in detections:
+            rows.append((d['class_id'], d['confidence'], weights[model_idx], model_idx, *d['bbox']))
+    if not rows:
+        return []
+    data = np.array(rows, dtype=np.float64)
+    total_weight = float(sum(weights))
+
+    fused = []
+    for class_id in np.unique(data[:, 0]).astype(int):
+        class_rows = data[data[:, 0] == class_id]
+        class_rows = class_rows[np.argsort(-class_rows[:, 1] * class_rows[:, 2])]
+        clusters = []        # member rows per cluster
+        cluster_boxes = []   # current fused box per cluster
+        for row in class_rows:
+            box = row[4:8]
+            if cluster_boxes:
+                ious = _iou(box, np.array(cluster_boxes))
+                best = int(np.argmax(ious))
+                if ious[best] >= iou_threshold:
+                    clusters[best].append(row)
+                    members = np.array(clusters[best])
+                    cluster_boxes[best] = np.average(members[:, 4:8], axis=0,
+                                                     weights=members[:, 1] * members[:, 2])
+                    continue
+            clusters.append([row])
+            cluster_boxes.append(box)
+        for members, box in zip(clusters, cluster_boxes):
+            members = np.array(members)
+            voters = {int(m) for m in members[:, 3]}
+            confidence = np.average(members[:, 1], weights=members[:, 2])
+            confidence *= sum(weights[m] for m in voters) / total_weight
+            x1, y1, x2, y2 = box
+            fused.append({
+                'class_id': int(class_id),
+                'class_name': class_names[class_id] if class_id < len(class_names) else f"Class {class_id}",
+                'confidence': float(confidence),
+                'bbox': [int(x1), int(y1), int(x2), int(y2)],
+            })
+    fused.sort(key=lambda d: -d['confidence'])
+    return fused
+
+
+class CascadeDetector:
+    """Runs the configured inference mode and keeps escalation statistics"""
+
+    def __init__(self, primary, screen=None, process_fn=None, class_names=None, mode=None):
+        self.primary = primary
+        self.screen = screen
+        self.process_fn = process_fn
+        self.class_names = class_names or []
+        self.mode = mode or CASCADE_MODE
+        if self.mode not in MODES:
+            print(f"Warning: unknown CASCADE_MODE '{self.mode}', using 'single'")
+            self.mode = 'single'
+        if self.mode != 'single' and self.screen is None:
+            print(f"Warning: no screening model loaded, CASCADE_MODE '{self.mode}' falls back to 'single'")
+            self.mode = 'single'
+        self._lock = threading.Lock()
+        self._stats = {'frames': 0, 'escalated': 0, 'reasons': {}}
+
+    def _run(self, model, image):
+        return self.process_fn(model(image, verbose=False))
+
+    def _record(self, reason):
+        with self._lock:
+            self._stats['frames'] += 1
+            if reason is not None:
+                self._stats['escalated'] += 1
+                self._stats['reasons'][reason] = self._stats['reasons'].get(reason, 0) + 1
+
+    def detect(self, image, mode=None):
+        """
+        Run detection on a decoded image.
+
+        Returns (detections, class_counts, info) where info records the mode
+        used and, in cascade mode, whether and why the frame was escalated.
+        """
+        mode = mode or self.mode
+        if mode != 'single' and self.screen is None:
+            mode = 'single'
+
+        if mode == 'single':
+            detections, class_counts = self._run(self.primary, image)
+            return detections, class_counts, {'mode': 'single', 'escalated': False}
+
+        if mode == 'ensemble':
+            screen_detections, _ = self._run(self.screen, image)
+            primary_detections, _ = self._run(self.primary, image)
+            detections = weighted_box_fusion([screen_detections, primary_detections],
+                                             WBF_WEIGHTS, self.class_names)
+            return detections, count_classes(detections), {'mode': 'ensemble', 'escalated': False}
+
+        detections, class_counts = self._run(self.screen, image)
+        reason = escalation_reason(detections)
+        if reason is not None:
+            detections, class_counts = self._run(self.primary, image)
+        self._record(reason)
+        return detections, class_counts, {'mode': 'cascade', 'escalated': reason is not None,
+                                          'escalation_reason': reason}
+
+    def stats(self):
+        """Escalation statistics for tuning the cascade thresholds"""
+        with self._lock:
+            frames = self._stats['frames']
+            return {
+                'mode': self.mode,
+                'screen_model_loaded': self.screen is not None,
+                'thresholds': {
+                    'min_confidence': ESCALATE_MIN_CONFIDENCE,
+                    'max_detections': ESCALATE_MAX_DETECTIONS,
+                },
+                'frames': frames,
+                'escalated': self._stats['escalated'],
+                'escalation_rate': self._stats['escalated'] / frames if frames else 0.0,
+                'reasons': dict(self._stats['reasons']),
+            }
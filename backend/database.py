@@ -0,0 +1,123 @@
+"""
+SQLite access for detections.db.
+
+The detections, daily_metrics and camera_status tables already exist in the
+shipped database; tables added by the server are created here on startup.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+DB_PATH = os.environ.get('DB_PATH', 'detections.db')
+
+
+@contextmanager
+def connect():
+    """Connection that commits on success, rolls back on error and always closes"""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _add_missing_column(conn, table, column, column_type):
+    columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+
+def init_db():
+    """Create the tables the server writes to if they do not exist yet"""
+    with connect() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS waste_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                camera_id TEXT,
+                track_id INTEGER,
+                class_id INTEGER,
+                class_name TEXT,
+                confidence REAL,
+                bbox_json TEXT,
+                first_seen DATETIME,
+                estimated_kg REAL
+            )
+        ''')
+        _add_missing_column(conn, 'waste_events', 'estimated_kg', 'REAL')
+        # Lets per-frame rows be attributed to a camera (used by the archive's per-camera queries)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'detections'").fetchone():
+            _add_missing_column(conn, 'detections', 'camera_id', 'TEXT')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_waste_events_timestamp ON waste_events (timestamp)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS camera_status (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                camera_id TEXT UNIQUE,
+                location TEXT,
+                status TEXT DEFAULT 'online',
+                last_activity DATETIME,
+                total_detections INTEGER DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Cameras registered by their first frame rather than listed up front; these expire when idle
+        _add_missing_column(conn, 'camera_status', 'auto_registered', 'INTEGER DEFAULT 0')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATE UNIQUE,
+                total_detections INTEGER DEFAULT 0,
+                total_waste_kg REAL DEFAULT 0.0,
+                most_wasted_item TEXT,
+                waste_by_category_json TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+
+def _add_to_daily_metrics(conn, day, class_counts, waste_kg=0.0):
+    row = conn.execute('SELECT total_detections, total_waste_kg, waste_by_category_json '
+                       'FROM daily_metrics WHERE date = ?', (day,)).fetchone()
+    by_category = json.loads(row['waste_by_category_json'] or '{}') if row else {}
+    for class_name, count in class_counts.items():
+        by_category[class_name] = by_category.get(class_name, 0) + count
+    total = (row['total_detections'] if row else 0) + sum(class_counts.values())
+    total_kg = (row['total_waste_kg'] or 0.0 if row else 0.0) + waste_kg
+    most_wasted = max(by_category, key=by_category.get) if by_category else None
+    if row:
+        conn.execute('''
+            UPDATE daily_metrics
+            SET total_detections = ?, total_waste_kg = ?, most_wasted_item = ?, waste_by_category_json = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE date = ?
+        ''', (total, total_kg, most_wasted, json.dumps(by_category), day))
+    else:
+        conn.execute('''
+            INSERT INTO daily_metrics (date, total_detections, total_waste_kg, most_wasted_item, waste_by_category_json)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (day, total, total_kg, most_wasted, json.dumps(by_category)))
+
+
+def record_item_events(events):
+    """Persist new-item events and add them to today's daily_metrics row"""
+    if not events:
+        return
+    class_counts = {}
+    for event in events:
+        class_counts[event['class_name']] = class_counts.get(event['class_name'], 0) + 1
+    waste_kg = sum(e.get('estimated_kg') or 0.0 for e in events)
+    with connect() as conn:
+        conn.executemany('''
+            INSERT INTO waste_events (camera_id, track_id, class_id, class_name, confidence, bbox_json,
+                                      first_seen, estimated_kg)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(e['camera_id'], e['track_id'], e['class_id'], e['class_name'], e['confidence'],
+               json.dumps(e['bbox']), e['first_seen'], e.get('estimated_kg')) for e in events])
+        _add_to_daily_metrics(conn, datetime.now().date().isoformat(), class_counts, waste_kg)
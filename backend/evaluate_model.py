@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Evaluation harness for the fruit detection models.
+
+Runs batched inference over the whole val split with a pool of worker
+processes, computes per-class mAP@0.5 and mAP@0.5:0.95 against the YOLO
+label files and measures per-image latency. One JSON report is written per
+weight file so model sizes (e.g. yolov8n vs yolov8s) can be compared on
+measured speed/accuracy.
+
+Usage:
+    python evaluate_model.py --weights models/best.pt runs/detect/fruit-detection2/weights/best.pt
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Class names for fruit detection (matching data.yaml)
+CLASS_NAMES = [
+    "apple", "tangerine", "pear", "watermelon", "durian",
+    "lemon", "grape", "pineapple", "dragon fruit", "korean melon", "cantaloupe"
+]
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DEFAULT_DATASET = Path(__file__).parent.parent / "datasets" / "fruit-object-detection"
+REPORTS_DIR = Path('reports')
+
+_worker_model = None
+_worker_args = None
+
+
+def find_val_images(dataset_dir):
+    """Image paths of the val split (val/images or valid/images)"""
+    dataset_dir = Path(dataset_dir)
+    for split in ('val', 'valid'):
+        images_dir = dataset_dir / split / 'images'
+        if images_dir.exists():
+            return sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return []
+
+
+def load_labels(image_path, width, height):
+    """Ground-truth boxes (xyxy pixels) and class ids from the YOLO label file"""
+    label_path = image_path.parent.parent / 'labels' / (image_path.stem + '.txt')
+    if not label_path.exists():
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    cls = rows[:, 0].astype(np.int64)
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, cls
+
+
+def box_iou(a, b):
+    """Pairwise IoU between two sets of xyxy boxes"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_predictions(pred_boxes, pred_cls, pred_conf, gt_boxes, gt_cls):
+    """
+    Greedy score-ordered matching of one image's predictions to its ground
+    truth, for every IoU threshold at once. Returns a (n_pred, n_thresholds)
+    boolean true-positive matrix in the original prediction order.
+    """
+    tp = np.zeros((len(pred_boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+    iou = box_iou(pred_boxes, gt_boxes)
+    iou[pred_cls[:, None] != gt_cls[None, :]] = 0.0
+    order = np.argsort(-pred_conf, kind='stable')
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        taken = np.zeros(len(gt_boxes), dtype=bool)
+        for i in order:
+            candidates = np.where((iou[i] >= threshold) & ~taken)[0]
+            if len(candidates):
+                j = candidates[np.argmax(iou[i, candidates])]
+                taken[j] = True
+                tp[i, t] = True
+    return tp
+
+
+def average_precision(tp, conf, n_gt):
+    """AP per IoU threshold (all-point interpolation) for one class"""
+    if n_gt == 0 or len(tp) == 0:
+        return np.zeros(tp.shape[1] if tp.ndim == 2 else len(IOU_THRESHOLDS))
+    order = np.argsort(-conf, kind='stable')
+    tp = tp[order]
+    tpc = np.cumsum(tp, axis=0)
+    fpc = np.cumsum(~tp, axis=0)
+    recall = tpc / n_gt
+    precision = tpc / (tpc + fpc)
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        r = np.concatenate([[0.0], recall[:, t], [1.0]])
+        p = np.concatenate([[1.0], precision[:, t], [0.0]])
+        p = np.flip(np.maximum.accumulate(np.flip(p)))
+        idx = np.where(r[1:] != r[:-1])[0]
+        ap[t] = np.sum((r[idx + 1] - r[idx]) * p[idx + 1])
+    return ap
+
+
+def compute_map(records, num_classes):
+    """Per-class and overall mAP@0.5 / mAP@0.5:0.95 from per-image records"""
+    tps, confs, classes = [], [], []
+    n_gt = np.zeros(num_classes, dtype=np.int64)
+    for rec in records:
+        tps.append(match_predictions(rec['pred_boxes'], rec['pred_cls'], rec['pred_conf'],
+                                     rec['gt_boxes'], rec['gt_cls']))
+        confs.append(rec['pred_conf'])
+        classes.append(rec['pred_cls'])
+        n_gt += np.bincount(rec['gt_cls'][rec['gt_cls'] < num_classes], minlength=num_classes)
+    tp = np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+    conf = np.concatenate(confs) if confs else np.zeros(0)
+    pred_cls = np.concatenate(classes) if classes else np.zeros(0, dtype=np.int64)
+
+    per_class = {}
+    aps = []
+    for c in range(num_classes):
+        mask = pred_cls == c
+        ap = average_precision(tp[mask], conf[mask], n_gt[c])
+        name = CLASS_NAMES[c] if c < len(CLASS_NAMES) else f"Class {c}"
+        per_class[name] = {
+            'instances': int(n_gt[c]),
+            'predictions': int(mask.sum()),
+            'mAP50': float(ap[0]),
+            'mAP50-95': float(ap.mean()),
+        }
+        if n_gt[c] > 0:
+            aps.append(ap)
+    aps = np.array(aps) if aps else np.zeros((1, len(IOU_THRESHOLDS)))
+    return {
+        'mAP50': float(aps[:, 0].mean()),
+        'mAP50-95': float(aps.mean()),
+        'per_class': per_class,
+    }
+
+
+def _init_worker(weights, device, imgsz, conf, threads):
+    global _worker_model, _worker_args
+    import torch
+    from ultralytics import YOLO
+    # Keep each worker's intra-op pool small so the pool does not oversubscribe the CPU
+    torch.set_num_threads(threads)
+    _worker_model = YOLO(weights)
+    _worker_args = {'device': device, 'imgsz': imgsz, 'conf': conf, 'verbose': False}
+
+
+def _predict_batch(image_paths):
+    """Run one batch in a worker; returns predictions and timing per image"""
+    start = time.perf_counter()
+    results = _worker_model([str(p) for p in image_paths], **_worker_args)
+    wall_ms = (time.perf_counter() - start) * 1000.0 / max(len(image_paths), 1)
+    out = []
+    for path, result in zip(image_paths, results):
+        boxes = result.boxes
+        height, width = result.orig_shape
+        out.append({
+            'path': str(path),
+            'width': int(width),
+            'height': int(height),
+            'pred_boxes': boxes.xyxy.cpu().numpy().astype(np.float32),
+            'pred_cls': boxes.cls.cpu().numpy().astype(np.int64),
+            'pred_conf': boxes.conf.cpu().numpy().astype(np.float32),
+            'speed': dict(result.speed),
+            'wall_ms': wall_ms,
+        })
+    return out
+
+
+def evaluate(weights, images, device='cpu', workers=1, batch=8, imgsz=640, conf=0.001):
+    """Evaluate one weight file on the given images and return a report dict"""
+    threads = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    batches = [images[i:i + batch] for i in range(0, len(images), batch)]
+    ctx = mp.get_context('spawn')
+    start = time.perf_counter()
+    with ctx.Pool(workers, initializer=_init_worker,
+                  initargs=(str(weights), device, imgsz, conf, threads)) as pool:
+        predictions = [p for chunk in pool.imap(_predict_batch, batches) for p in chunk]
+    total_s = time.perf_counter() - start
+
+    records = []
+    for pred in predictions:
+        gt_boxes, gt_cls = load_labels(Path(pred['path']), pred['width'], pred['height'])
+        records.append(dict(pred, gt_boxes=gt_boxes, gt_cls=gt_cls))
+    metrics = compute_map(records, len(CLASS_NAMES))
+
+    inference_ms = np.array([r['speed'].get('inference', 0.0) for r in records])
+    end_to_end_ms = np.array([sum(r['speed'].values()) for r in records])
+    wall_ms = np.array([r['wall_ms'] for r in records])
+    def _summary(values):
+        if len(values) == 0:
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0}
+        return {
+            'mean': float(values.mean()),
+            'p50': float(np.percentile(values, 50)),
+            'p95': float(np.percentile(values, 95)),
+        }
+
+    return {
+        'weights': str(weights),
+        'weights_size_mb': round(Path(weights).stat().st_size / 1e6, 2) if Path(weights).exists() else None,
+        'evaluated_at': datetime.now().isoformat(timespec='seconds'),
+        'images': len(records),
+        'device': device,
+        'workers': workers,
+        'batch': batch,
+        'imgsz': imgsz,
+        'metrics': metrics,
+        'latency_ms': {
+            'inference': _summary(inference_ms),
+            'end_to_end': _summary(end_to_end_ms),
+            'wall_per_image': _summary(wall_ms),
+        },
+        'throughput_images_per_s': len(records) / total_s if total_s > 0 else 0.0,
+    }
+
+
+def write_report(report):
+    """Write a report to reports/eval_<weights>_<timestamp>.json"""
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    weights = Path(report['weights'])
+    tag = f"{weights.parent.parent.name}-{weights.stem}" if weights.parent.name == 'weights' else weights.stem
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report_path = REPORTS_DIR / f"eval_{tag}_{stamp}.json"
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report_path
+
+
+def print_comparison(reports):
+    """Print a speed/accuracy table across evaluated weight files"""
+    print(f"\n{'weights':50} {'mAP50':>7} {'mAP50-95':>9} {'ms/img p50':>11} {'ms/img p95':>11} {'img/s':>7}")
+    for r in reports:
+        latency = r['latency_ms']['end_to_end']
+        print(f"{r['weights'][-50:]:50} {r['metrics']['mAP50']:7.3f} {r['metrics']['mAP50-95']:9.3f} "
+              f"{latency['p50']:11.1f} {latency['p95']:11.1f} {r['throughput_images_per_s']:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate fruit detection weights on the val split")
+    parser.add_argument('--weights', nargs='+', default=['models/best.pt'], help="Weight files to evaluate")
+    parser.add_argument('--dataset', default=str(DEFAULT_DATASET), help="Dataset directory containing val/images")
+    parser.add_argument('--device', default=None, help="cpu or cuda:0 (auto-detected by default)")
+    parser.add_argument('--workers', type=int, default=None, help="Inference worker processes")
+    parser.add_argument('--batch', type=int, default=8, help="Images per inference batch")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.001, help="Confidence threshold used for mAP")
+    parser.add_argument('--limit', type=int, default=None, help="Only evaluate the first N images")
+    args = parser.parse_args()
+
+    device = args.device
+    if device is None:
+        import torch
+        device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    # A single process already saturates a GPU; on CPU split the cores across workers
+    workers = args.workers or (1 if device != "cpu" else max(1, min(4, os.cpu_count() or 1)))
+
+    images = find_val_images(args.dataset)
+    if args.limit:
+        images = images[:args.limit]
+    if not images:
+        print(f"❌ No val images found under {args.dataset}")
+        return
+
+    print(f"🧪 Evaluating {len(args.weights)} model(s) on {len(images)} val images "
+          f"({workers} worker(s), batch {args.batch}, {device})")
+    reports = []
+    for weights in args.weights:
+        print(f"\n🔍 {weights}")
+        report = evaluate(weights, images, device=device, workers=workers,
+                          batch=args.batch, imgsz=args.imgsz, conf=args.conf)
+        report_path = write_report(report)
+        print(f"   mAP50: {report['metrics']['mAP50']:.3f}  mAP50-95: {report['metrics']['mAP50-95']:.3f}")
+        for name, stats in report['metrics']['per_class'].items():
+            print(f"   {name:14} n={stats['instances']:4}  mAP50={stats['mAP50']:.3f}  mAP50-95={stats['mAP50-95']:.3f}")
+        print(f"📁 Report written to: {report_path}")
+        reports.append(report)
+
+    print_comparison(reports)
+
+
+if __name__ == "__main__":
+    main()
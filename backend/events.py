@@ -0,0 +1,318 @@
+"""
+Live dashboard updates over Server-Sent Events.
+
+The SSE endpoint is served by a separate asyncio process (python events.py),
+not by the inference server: every open connection is a coroutine waiting
+on an asyncio.Event, so thousands of idle dashboards hold no thread and
+blocking torch calls in the inference server never stall a stream. The
+inference server publishes through EventPublisher, which hands events to a
+background thread that forwards them as JSON lines to the event server's
+local publish port; publishing never blocks a request, and events are
+dropped (and counted) while the event server is down or behind.
+
+Each subscriber owns a bounded buffer of detection events plus one pending
+metrics delta that absorbs every metrics update until the subscriber reads
+it, so slow consumers receive coalesced updates instead of an ever-growing
+backlog.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+EVENT_BUFFER_SIZE = int(os.environ.get('EVENT_BUFFER_SIZE', '100'))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', '15'))
+MAX_SUBSCRIBERS = int(os.environ.get('MAX_SUBSCRIBERS', '5000'))
+EVENT_SERVER_HOST = os.environ.get('EVENT_SERVER_HOST', '0.0.0.0')
+EVENT_SERVER_PORT = int(os.environ.get('EVENT_SERVER_PORT', '5001'))
+# Publish port only accepts the inference server, keep it on loopback
+EVENT_PUBLISH_HOST = os.environ.get('EVENT_PUBLISH_HOST', '127.0.0.1')
+EVENT_PUBLISH_PORT = int(os.environ.get('EVENT_PUBLISH_PORT', '5002'))
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', '1000'))
+EVENT_RECONNECT_SECONDS = float(os.environ.get('EVENT_RECONNECT_SECONDS', '2'))
+
+_CORS_HEADERS = 'Access-Control-Allow-Origin: *\r\n'
+
+
+def _merge_delta(target, delta):
+    """Add a metrics delta into target (numbers are summed, dicts merged)"""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            _merge_delta(target.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            target[key] = target.get(key, 0) + value
+        else:
+            target[key] = value
+
+
+def _sse(topic, data):
+    return f"event: {topic}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscriber:
+    """One connected client: bounded event buffer plus a coalesced metrics delta"""
+
+    def __init__(self, subscriber_id, topics=None, buffer_size=None):
+        self.id = subscriber_id
+        self.topics = set(topics) if topics else None
+        self.events = deque(maxlen=buffer_size or EVENT_BUFFER_SIZE)
+        self.pending_metrics = None
+        self.dropped = 0
+        self.wakeup = asyncio.Event()
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def push(self, topic, data):
+        if topic == 'metrics':
+            if self.pending_metrics is None:
+                self.pending_metrics = {}
+            _merge_delta(self.pending_metrics, data)
+        else:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append((topic, data))
+        self.wakeup.set()
+
+    def drain(self):
+        """Everything buffered since the last drain, oldest first"""
+        items = list(self.events)
+        self.events.clear()
+        if self.pending_metrics is not None:
+            items.append(('metrics', self.pending_metrics))
+            self.pending_metrics = None
+        if self.dropped:
+            items.insert(0, ('overflow', {'dropped': self.dropped}))
+            self.dropped = 0
+        self.wakeup.clear()
+        return items
+
+
+class EventHub:
+    """
+    Fans published events out to every subscriber interested in the topic.
+    Lives on the event server's loop; no locking is needed there.
+    """
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers or MAX_SUBSCRIBERS
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, topics=None):
+        """Register a subscriber, or return None when the hub is full"""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(next(self._ids), topics)
+        self._subscribers[subscriber.id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.pop(subscriber.id, None)
+
+    def publish(self, topic, data):
+        self.published += 1
+        for subscriber in self._subscribers.values():
+            if subscriber.wants(topic):
+                subscriber.push(topic, data)
+
+    async def stream(self, subscriber, heartbeat_seconds=None):
+        """SSE message generator for one subscriber; unsubscribes when closed"""
+        heartbeat_seconds = heartbeat_seconds or EVENT_HEARTBEAT_SECONDS
+        try:
+            yield _sse('hello', {'subscriber_id': subscriber.id})
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing idle connections
+                    yield f": keepalive {int(time.time())}\n\n"
+                    continue
+                for topic, data in subscriber.drain():
+                    yield _sse(topic, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        subscribers = list(self._subscribers.values())
+        return {
+            'subscribers': len(subscribers),
+            'max_subscribers': self.max_subscribers,
+            'published': self.published,
+            'buffered_events': sum(len(s.events) for s in subscribers),
+        }
+
+
+class EventServer:
+    """
+    Minimal asyncio HTTP server for GET /api/events (SSE) and
+    GET /api/events/stats, plus the JSON-lines publish port.
+    """
+
+    def __init__(self, hub=None, heartbeat_seconds=None):
+        self.hub = hub or EventHub()
+        self.heartbeat_seconds = heartbeat_seconds
+        self.publishers = 0
+
+    async def _respond(self, writer, status, body, content_type='application/json'):
+        payload = body.encode()
+        writer.write((f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                      f"Content-Length: {len(payload)}\r\n{_CORS_HEADERS}Connection: close\r\n\r\n").encode()
+                     + payload)
+        await writer.drain()
+
+    async def handle_http(self, reader, writer):
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+                method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                return
+            url = urlsplit(target)
+            if method == 'OPTIONS':
+                writer.write((f"HTTP/1.1 204 No Content\r\n{_CORS_HEADERS}"
+                              "Access-Control-Allow-Methods: GET\r\nConnection: close\r\n\r\n").encode())
+                await writer.drain()
+            elif method != 'GET':
+                await self._respond(writer, '405 Method Not Allowed', json.dumps({'error': 'Method not allowed'}))
+            elif url.path == '/api/events/stats':
+                await self._respond(writer, '200 OK', json.dumps(dict(self.hub.stats(), publishers=self.publishers)))
+            elif url.path == '/api/events':
+                await self._stream(writer, parse_qs(url.query).get('topics', [''])[0])
+            else:
+                await self._respond(writer, '404 Not Found', json.dumps({'error': 'Not found'}))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer, topics):
+        subscriber = self.hub.subscribe(topics.split(',') if topics else None)
+        if subscriber is None:
+            await self._respond(writer, '503 Service Unavailable',
+                                json.dumps({'success': False, 'error': 'Too many subscribers'}))
+            return
+        writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                      f"X-Accel-Buffering: no\r\n{_CORS_HEADERS}Connection: close\r\n\r\n").encode())
+        messages = self.hub.stream(subscriber, self.heartbeat_seconds)
+        try:
+            async for message in messages:
+                writer.write(message.encode())
+                await writer.drain()
+        finally:
+            await messages.aclose()
+
+    async def handle_publisher(self, reader, writer):
+        """One JSON object per line: {"topic": ..., "data": ...}"""
+        self.publishers += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    self.hub.publish(message['topic'], message['data'])
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Warning: ignoring malformed event: {e}")
+        finally:
+            self.publishers -= 1
+            writer.close()
+
+    async def start(self, host=None, port=None, publish_host=None, publish_port=None):
+        """Start both listeners; returns (http_server, publish_server)"""
+        http_server = await asyncio.start_server(
+            self.handle_http, host or EVENT_SERVER_HOST, EVENT_SERVER_PORT if port is None else port)
+        publish_server = await asyncio.start_server(
+            self.handle_publisher, publish_host or EVENT_PUBLISH_HOST,
+            EVENT_PUBLISH_PORT if publish_port is None else publish_port, limit=1 << 20)
+        return http_server, publish_server
+
+    async def serve_forever(self):
+        http_server, publish_server = await self.start()
+        print(f"Event server listening on {EVENT_SERVER_HOST}:{EVENT_SERVER_PORT} "
+              f"(publish port {EVENT_PUBLISH_HOST}:{EVENT_PUBLISH_PORT})")
+        async with http_server, publish_server:
+            await asyncio.gather(http_server.serve_forever(), publish_server.serve_forever())
+
+
+class EventPublisher:
+    """
+    Inference-server side of the event pipeline: a bounded queue drained by
+    one background thread that keeps a connection to the event server open.
+    """
+
+    def __init__(self, host=None, port=None, queue_size=None):
+        self.host = host or EVENT_PUBLISH_HOST
+        self.port = EVENT_PUBLISH_PORT if port is None else port
+        self._queue = queue.Queue(maxsize=queue_size or EVENT_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._sock = None
+        self._retry_at = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    def publish(self, topic, data):
+        """Queue an event for the event server; never blocks"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-publisher', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((topic, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def _connect(self):
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=5)
+        except OSError:
+            self._retry_at = time.monotonic() + EVENT_RECONNECT_SECONDS
+            return None
+        return self._sock
+
+    def _run(self):
+        while True:
+            topic, data = self._queue.get()
+            line = (json.dumps({'topic': topic, 'data': data}) + '\n').encode()
+            sock = self._sock or self._connect()
+            if sock is None:
+                self.dropped += 1
+                continue
+            try:
+                sock.sendall(line)
+                self.sent += 1
+            except OSError:
+                sock.close()
+                self._sock = None
+                self.dropped += 1
+
+    def stats(self):
+        return {
+            'event_server': f"{self.host}:{self.port}",
+            'connected': self._sock is not None,
+            'queued': self._queue.qsize(),
+            'sent': self.sent,
+            'dropped': self.dropped,
+        }
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(EventServer().serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,136 @@
+"""
+Idempotent request handling for the upload endpoints.
+
+A request is identified by its Idempotency-Key header (or idempotency_key
+form field) or, without one, by the endpoint plus the SHA-256 of the image,
+so a client retry or a duplicated upload returns the stored response instead
+of running inference and writing files again. Responses live in an in-memory
+LRU backed by a short-lived SQLite table so they survive a restart, and
+concurrent duplicates wait for the first request rather than recomputing.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '3600'))
+IDEMPOTENCY_MEMORY_ENTRIES = int(os.environ.get('IDEMPOTENCY_MEMORY_ENTRIES', '512'))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '5'))
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def request_key(req, endpoint, image_hash):
+    """Explicit idempotency key if the client sent one, else endpoint + image content"""
+    key = req.headers.get('Idempotency-Key') or req.form.get('idempotency_key')
+    if key:
+        return f"{endpoint}:key:{key}"
+    scope = req.form.get('camera_id', '')
+    return f"{endpoint}:sha256:{scope}:{image_hash}"
+
+
+class IdempotencyStore:
+    """Short-lived response store: memory LRU in front of an SQLite table"""
+
+    def __init__(self, ttl_seconds=None, memory_entries=None):
+        self.ttl_seconds = IDEMPOTENCY_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.memory_entries = IDEMPOTENCY_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self._memory = OrderedDict()  # key -> (expires_at, response)
+        self._in_flight = {}          # key -> Event set when the owner finishes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def init_db(self):
+        with database.connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS idempotency_responses (
+                    key TEXT PRIMARY KEY,
+                    response_json TEXT,
+                    expires_at REAL
+                )
+            ''')
+            conn.execute('DELETE FROM idempotency_responses WHERE expires_at < ?', (time.time(),))
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+        with database.connect() as conn:
+            row = conn.execute('SELECT response_json, expires_at FROM idempotency_responses '
+                               'WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        if row is None:
+            return None
+        response = json.loads(row['response_json'])
+        self._remember(key, row['expires_at'], response)
+        return response
+
+    def _remember(self, key, expires_at, response):
+        with self._lock:
+            self._memory[key] = (expires_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def begin(self, key):
+        """
+        Stored response for key, or None after claiming key for this request.
+
+        When another request with the same key is in flight, wait for it and
+        return its response; if it stored nothing, this request takes over.
+        """
+        while True:
+            response = self._lookup(key)
+            if response is not None:
+                self.hits += 1
+                return response
+            with self._lock:
+                waiter = self._in_flight.get(key)
+                if waiter is None:
+                    # The previous owner may have finished between the lookup and here
+                    entry = self._memory.get(key)
+                    if entry is not None and entry[0] > time.time():
+                        self.hits += 1
+                        return entry[1]
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    return None
+            # The owner always releases its claim, so keep waiting and re-check
+            waiter.wait(IDEMPOTENCY_WAIT_SECONDS)
+
+    def complete(self, key, response):
+        """Store the response for key and wake any waiting duplicates"""
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, response)
+        with database.connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO idempotency_responses (key, response_json, expires_at) '
+                         'VALUES (?, ?, ?)', (key, json.dumps(response), expires_at))
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute('DELETE FROM idempotency_responses WHERE expires_at < ?', (time.time(),))
+        self.release(key)
+
+    def release(self, key):
+        """Give up the claim on key without storing anything (e.g. the request failed)"""
+        with self._lock:
+            waiter = self._in_flight.pop(key, None)
+        if waiter is not None:
+            waiter.set()
+
+    def stats(self):
+        with self._lock:
+            return {'memory_entries': len(self._memory), 'in_flight': len(self._in_flight),
+                    'hits': self.hits, 'misses': self.misses}
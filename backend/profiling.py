@@ -0,0 +1,130 @@
+"""
+Profiling hooks for the inference server.
+
+SamplingProfiler samples every thread's Python stack at a fixed interval for
+a few seconds and returns the stacks in folded format ("a;b;c count" per
+line), which flamegraph.pl, speedscope and similar tools read directly.
+RequestTrace records how long each stage of a request took; SlowRequestLog
+keeps the last K traces of requests slower than a threshold, together with
+the input image metadata, for later inspection.
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '2000'))
+SLOW_REQUEST_BUFFER = int(os.environ.get('SLOW_REQUEST_BUFFER', '50'))
+
+
+def is_admin(req):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set and matched"""
+    token = req.headers.get('X-Admin-Token', '')
+    # compare_digest only accepts ASCII str, so compare bytes to turn odd headers into a 403
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over all threads; one run at a time"""
+
+    def __init__(self):
+        self._running = threading.Lock()
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}".replace(' ', '_'))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def run(self, seconds, interval_ms=None):
+        """
+        Sample for the given number of seconds and return (folded_stacks,
+        samples), or None if another profile is already running.
+        """
+        if not self._running.acquire(blocking=False):
+            return None
+        try:
+            interval = (PROFILE_INTERVAL_MS if interval_ms is None else interval_ms) / 1000.0
+            seconds = min(seconds, PROFILE_MAX_SECONDS)
+            own_id = threading.get_ident()
+            thread_names = {}
+            stacks = Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    if thread_id not in thread_names:
+                        thread_names = {t.ident: t.name for t in threading.enumerate()}
+                    thread_name = str(thread_names.get(thread_id, thread_id)).replace(' ', '_')
+                    stacks[f"{thread_name};{self._fold(frame)}"] += 1
+                samples += 1
+                time.sleep(interval)
+            lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+            return '\n'.join(lines) + '\n', samples
+        finally:
+            self._running.release()
+
+
+class RequestTrace:
+    """Per-request stage timings, recorded as laps between calls to lap()"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self._last = self.started
+        self.stages = []
+        self.meta = {}
+
+    def lap(self, stage):
+        """Attribute the time since the previous lap (or the start) to stage"""
+        now = time.perf_counter()
+        self.stages.append((stage, (now - self._last) * 1000.0))
+        self._last = now
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def to_dict(self, status=None):
+        return {
+            'endpoint': self.endpoint,
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'status': status,
+            'total_ms': round(self.total_ms(), 2),
+            'stages': [{'stage': name, 'ms': round(ms, 2)} for name, ms in self.stages],
+            'image': dict(self.meta),
+        }
+
+
+class SlowRequestLog:
+    """Ring buffer of the last K requests slower than the threshold"""
+
+    def __init__(self, threshold_ms=None, size=None):
+        self.threshold_ms = SLOW_REQUEST_MS if threshold_ms is None else threshold_ms
+        self._entries = deque(maxlen=SLOW_REQUEST_BUFFER if size is None else size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(self, trace, status=None):
+        if trace.total_ms() < self.threshold_ms:
+            return False
+        entry = trace.to_dict(status)
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        return True
+
+    def entries(self):
+        with self._lock:
+            return list(reversed(self._entries))
@@ -0,0 +1,114 @@
+"""
+CPU thread and frame-memory budgeting for the inference server.
+
+Without limits every Flask thread runs torch and OpenCV with pools as wide as
+the machine, so concurrent requests oversubscribe the CPU. configure() pins
+the torch intra/inter-op and OpenCV pool sizes so that INFERENCE_SLOTS
+concurrent inferences (enforced by cameras.FairScheduler) share the cores,
+and FrameBudget caps the bytes of compressed plus decoded frames in flight.
+Frames are charged from their header size before OpenCV decodes them;
+frames whose header cannot be read are rejected, and the upload itself is
+capped at MAX_UPLOAD_MB.
+"""
+
+import io
+import os
+import threading
+
+from PIL import Image
+
+import cameras
+
+CPU_COUNT = os.cpu_count() or 1
+TORCH_INTRA_OP_THREADS = int(os.environ.get('TORCH_INTRA_OP_THREADS', '0')) or max(1, CPU_COUNT // max(cameras.INFERENCE_SLOTS, 1))
+TORCH_INTER_OP_THREADS = int(os.environ.get('TORCH_INTER_OP_THREADS', '1'))
+OPENCV_THREADS = int(os.environ.get('OPENCV_THREADS', '1'))
+MAX_INFLIGHT_FRAME_MB = float(os.environ.get('MAX_INFLIGHT_FRAME_MB', '256'))
+MAX_UPLOAD_MB = float(os.environ.get('MAX_UPLOAD_MB', '20'))
+FRAME_BUDGET_TIMEOUT = float(os.environ.get('FRAME_BUDGET_TIMEOUT', '10'))
+
+_applied = {}
+
+
+def configure():
+    """Apply the thread settings to torch and OpenCV; call before loading models"""
+    import cv2
+    import torch
+    torch.set_num_threads(TORCH_INTRA_OP_THREADS)
+    try:
+        torch.set_num_interop_threads(TORCH_INTER_OP_THREADS)
+    except RuntimeError as e:
+        # Only allowed before the first inter-op parallel work
+        print(f"Warning: could not set torch inter-op threads: {e}")
+    cv2.setNumThreads(OPENCV_THREADS)
+    _applied.update({
+        'torch_intra_op_threads': torch.get_num_threads(),
+        'torch_inter_op_threads': torch.get_num_interop_threads(),
+        'opencv_threads': cv2.getNumThreads(),
+    })
+    return dict(_applied)
+
+
+def frame_cost(image_bytes):
+    """
+    Compressed size plus the decoded BGR frame and its annotated copy, sized
+    from the image header, or None if the header cannot be read.
+    """
+    try:
+        width, height = Image.open(io.BytesIO(image_bytes)).size
+    except Exception:
+        # Includes Pillow's DecompressionBombError: OpenCV would still decode
+        # such a frame in full, so it must not get through uncharged
+        return None
+    return len(image_bytes) + 2 * width * height * 3
+
+
+class FrameBudget:
+    """Bounded pool of in-flight frame bytes"""
+
+    def __init__(self, limit_bytes=None):
+        self.limit = int(MAX_INFLIGHT_FRAME_MB * 2 ** 20) if limit_bytes is None else int(limit_bytes)
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def reserve(self, nbytes, timeout=None):
+        """Wait until nbytes fit in the budget; False if they never can or the wait timed out"""
+        timeout = FRAME_BUDGET_TIMEOUT if timeout is None else timeout
+        with self._cond:
+            if nbytes > self.limit or not self._cond.wait_for(
+                    lambda: self.in_flight + nbytes <= self.limit, timeout):
+                self.rejected += 1
+                return False
+            self.in_flight += nbytes
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self, nbytes):
+        with self._cond:
+            self.in_flight -= nbytes
+            self._cond.notify_all()
+
+    def state(self):
+        with self._cond:
+            return {
+                'limit_mb': round(self.limit / 2 ** 20, 1),
+                'in_flight_mb': round(self.in_flight / 2 ** 20, 1),
+                'peak_mb': round(self.peak / 2 ** 20, 1),
+                'rejected': self.rejected,
+            }
+
+
+def state():
+    """Configured and applied thread settings"""
+    return {
+        'cpu_count': CPU_COUNT,
+        'configured': {
+            'torch_intra_op_threads': TORCH_INTRA_OP_THREADS,
+            'torch_inter_op_threads': TORCH_INTER_OP_THREADS,
+            'opencv_threads': OPENCV_THREADS,
+            'inference_slots': cameras.INFERENCE_SLOTS,
+        },
+        'applied': dict(_applied),
+    }
@@ -0,0 +1,273 @@
+"""
+Training run registry for the fruit detection models.
+
+Keeps a small JSON manifest (runs/registry.json) with one entry per
+runs/detect/fruit-detection<N> directory: its path, status, epochs, final
+metrics, weight hashes and promotion status. The manifest also stores pointers
+to the latest, best and promoted runs so the server and the training pipeline
+can resolve a model without describing every run on every call. Runs are
+registered as 'running' when training starts and 'finished' when it ends.
+Lookups only read the manifest; runs/detect is scanned when the manifest is
+missing, by rebuild(), or by discover_runs() (the training pipeline calls it
+before resuming, to find runs the manifest does not know yet).
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+RUNS_DIR = Path('runs') / 'detect'
+REGISTRY_PATH = Path('runs') / 'registry.json'
+RUN_PREFIX = 'fruit-detection'
+BEST_METRIC = 'mAP50-95'
+
+# Columns of ultralytics' results.csv we keep in the registry
+_RESULT_COLUMNS = {
+    'metrics/precision(B)': 'precision',
+    'metrics/recall(B)': 'recall',
+    'metrics/mAP50(B)': 'mAP50',
+    'metrics/mAP50-95(B)': 'mAP50-95',
+}
+
+_lock = threading.Lock()
+
+
+def run_index(name):
+    """Numeric suffix of a fruit-detection<N> run name (no suffix -> 0)"""
+    suffix = name.replace(RUN_PREFIX, '')
+    return int(suffix) if suffix.isdigit() else 0
+
+
+def _empty_registry():
+    return {'version': 1, 'runs': {}, 'latest': None, 'best': None, 'promoted': None}
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_results(run_dir):
+    """Read epochs and final-epoch metrics from a run's results.csv"""
+    results_path = run_dir / 'results.csv'
+    if not results_path.exists():
+        return None, {}
+    try:
+        with open(results_path, newline='') as f:
+            rows = [{k.strip(): v.strip() for k, v in row.items() if k} for row in csv.DictReader(f)]
+    except Exception:
+        return None, {}
+    if not rows:
+        return None, {}
+    last = rows[-1]
+    metrics = {}
+    for column, key in _RESULT_COLUMNS.items():
+        try:
+            metrics[key] = float(last[column])
+        except (KeyError, ValueError):
+            pass
+    return len(rows), metrics
+
+
+def _describe_run(run_dir, status='discovered'):
+    """Build a registry entry from a run directory on disk"""
+    epochs, metrics = _read_results(run_dir)
+    weights = {}
+    for weight_name in ('best.pt', 'last.pt'):
+        weight_path = run_dir / 'weights' / weight_name
+        if weight_path.exists():
+            weights[weight_name] = {
+                'path': weight_path.as_posix(),
+                'sha256': _file_sha256(weight_path),
+            }
+    return {
+        'name': run_dir.name,
+        'path': run_dir.as_posix(),
+        'index': run_index(run_dir.name),
+        'status': status,
+        'epochs': epochs,
+        'metrics': metrics,
+        'weights': weights,
+        'promoted': False,
+        'registered_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def _pick_best(runs):
+    scored = [r for r in runs.values() if BEST_METRIC in r.get('metrics', {})]
+    if not scored:
+        return None
+    return max(scored, key=lambda r: (r['metrics'][BEST_METRIC], r['index']))['name']
+
+
+def _save(registry):
+    REGISTRY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = REGISTRY_PATH.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+def _scan_runs_dir():
+    """Run directories on disk, oldest first (numeric suffix, then mtime)"""
+    if not RUNS_DIR.exists():
+        return []
+    run_dirs = [d for d in RUNS_DIR.iterdir() if d.is_dir() and d.name.startswith(RUN_PREFIX)]
+    run_dirs.sort(key=lambda p: (run_index(p.name), p.stat().st_mtime))
+    return run_dirs
+
+
+def rebuild():
+    """Rebuild the manifest from runs/detect (one-off migration / repair)"""
+    with _lock:
+        previous = _load_unlocked(allow_rebuild=False)
+        registry = _empty_registry()
+        for run_dir in _scan_runs_dir():
+            entry = _describe_run(run_dir)
+            old = previous['runs'].get(entry['name'])
+            if old:
+                entry['status'] = old.get('status', entry['status'])
+                entry['promoted'] = old.get('promoted', False)
+                entry['registered_at'] = old.get('registered_at', entry['registered_at'])
+            registry['runs'][entry['name']] = entry
+            registry['latest'] = entry['name']
+            if entry['promoted']:
+                registry['promoted'] = entry['name']
+        registry['best'] = _pick_best(registry['runs'])
+        _save(registry)
+        return registry
+
+
+def _load_unlocked(allow_rebuild=True):
+    if REGISTRY_PATH.exists():
+        try:
+            with open(REGISTRY_PATH) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: could not read run registry {REGISTRY_PATH}: {e}")
+    if allow_rebuild:
+        return None
+    return _empty_registry()
+
+
+def _is_newer(registry, name):
+    latest = registry['runs'].get(registry.get('latest'))
+    return latest is None or run_index(name) >= latest['index']
+
+
+def _add_unknown_runs(registry):
+    """Add run directories missing from the manifest; True if any were added"""
+    added = False
+    for run_dir in _scan_runs_dir():
+        if run_dir.name in registry['runs']:
+            continue
+        entry = _describe_run(run_dir)
+        registry['runs'][entry['name']] = entry
+        if _is_newer(registry, entry['name']):
+            registry['latest'] = entry['name']
+        added = True
+    if added:
+        registry['best'] = _pick_best(registry['runs'])
+    return added
+
+
+def load():
+    """Load the manifest, building it from runs/detect the first time"""
+    with _lock:
+        registry = _load_unlocked()
+    if registry is None:
+        registry = rebuild()
+    return registry
+
+
+def discover_runs():
+    """Add run directories missing from the manifest (e.g. interrupted runs); returns the manifest"""
+    registry = load()
+    with _lock:
+        if _add_unknown_runs(registry):
+            _save(registry)
+    return registry
+
+
+def _record_run(run_dir, status):
+    run_dir = Path(run_dir)
+    registry = load()
+    with _lock:
+        entry = _describe_run(run_dir, status)
+        old = registry['runs'].get(entry['name'])
+        if old:
+            entry['promoted'] = old.get('promoted', False)
+            entry['registered_at'] = old.get('registered_at', entry['registered_at'])
+        registry['runs'][entry['name']] = entry
+        registry['latest'] = entry['name']
+        registry['best'] = _pick_best(registry['runs'])
+        _save(registry)
+    return entry
+
+
+def start_run(run_dir):
+    """Record a run as 'running' when training starts and make it the latest run"""
+    return _record_run(run_dir, 'running')
+
+
+def register_run(run_dir):
+    """Record (or refresh) a run after training and mark it 'finished'"""
+    return _record_run(run_dir, 'finished')
+
+
+def mark_promoted(name):
+    """Flag a run as the one copied to models/best.pt"""
+    registry = load()
+    with _lock:
+        if name not in registry['runs']:
+            return None
+        for entry in registry['runs'].values():
+            entry['promoted'] = entry['name'] == name
+        registry['promoted'] = name
+        _save(registry)
+        return registry['runs'][name]
+
+
+def get_run(which='latest'):
+    """Registry entry for 'latest', 'best', 'promoted' or a run name"""
+    registry = load()
+    name = registry.get(which) if which in ('latest', 'best', 'promoted') else which
+    return registry['runs'].get(name) if name else None
+
+
+def latest_run_dir():
+    """Path of the most recently registered run, or None"""
+    entry = get_run('latest')
+    return Path(entry['path']) if entry else None
+
+
+def weights_path(entry, prefer='best.pt'):
+    """Path to a run's weights, falling back to the other checkpoint"""
+    if entry is None:
+        return None
+    weights = entry.get('weights', {})
+    for weight_name in (prefer, 'last.pt', 'best.pt'):
+        if weight_name in weights:
+            return Path(weights[weight_name]['path'])
+    if not weights:
+        # Runs registered at train start (and then interrupted) have no weights recorded
+        for weight_name in (prefer, 'last.pt', 'best.pt'):
+            on_disk = Path(entry['path']) / 'weights' / weight_name
+            if on_disk.exists():
+                return on_disk
+    return None
+
+
+if __name__ == '__main__':
+    registry = rebuild()
+    print(f"Registered {len(registry['runs'])} run(s) in {REGISTRY_PATH}")
+    print(f"   latest:   {registry['latest']}")
+    print(f"   best:     {registry['best']}")
+    print(f"   promoted: {registry['promoted']}")
@@ -7,6 +7,8 @@ import os
 import sys
 from pathlib import Path
 
+import run_registry
+
 def test_device_detection():
     """Test the device detection logic"""
     print("🧪 Testing device detection...")
@@ -31,23 +33,18 @@ def test_run_detection():
     """Test the existing run detection logic"""
     print("\n🔍 Testing run detection...")
     
-    runs_dir = Path("runs/detect")
-    existing_runs = []
-    if runs_dir.exists():
-        for run_dir in runs_dir.iterdir():
-            if run_dir.is_dir() and run_dir.name.startswith("fruit-detection"):
-                existing_runs.append(run_dir.name)
-    
-    # Sort runs to find the latest
-    existing_runs.sort()
-    latest_run = existing_runs[-1] if existing_runs else None
+    # Same lookup the training pipeline does before resuming
+    run_registry.discover_runs()
+    latest_entry = run_registry.get_run('latest')
+    latest_run = latest_entry['name'] if latest_entry else None
     
     if latest_run:
         print(f"✅ Found existing training run: {latest_run}")
-        print(f"📁 Latest run path: runs/detect/{latest_run}")
+        print(f"📁 Latest run path: {latest_entry['path']}")
+        print(f"   Epochs: {latest_entry['epochs']}, metrics: {latest_entry['metrics']}")
         
         # Check if weights exist
-        weights_path = Path(f"runs/detect/{latest_run}/weights")
+        weights_path = Path(latest_entry['path']) / "weights"
         if weights_path.exists():
             best_pt = weights_path / "best.pt"
             last_pt = weights_path / "last.pt"
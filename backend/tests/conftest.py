@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# The server modules are flat siblings imported as `import module`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+CLASS_NAMES = ['apple', 'pear']
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Fresh detections.db under tmp_path with the server's schema"""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'detections.db'))
+    database.init_db()
+    return tmp_path
+
+
+@pytest.fixture
+def class_names():
+    return list(CLASS_NAMES)
+
+
+@pytest.fixture
+def det():
+    """Builds a detection dict the way the model wrapper returns them"""
+    def make(bbox, confidence=0.9, class_id=0):
+        return {'class_id': class_id, 'class_name': CLASS_NAMES[class_id], 'confidence': confidence, 'bbox': bbox}
+    return make
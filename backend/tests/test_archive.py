@@ -0,0 +1,105 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+import archive
+import database
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(archive, 'ARCHIVE_DIR', db / 'archive' / 'detections')
+    with database.connect() as conn:
+        conn.execute('''
+            CREATE TABLE detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                detections_json TEXT,
+                processing_time REAL,
+                camera_id TEXT
+            )
+        ''')
+    return db
+
+
+OLD_DAYS = [date.today() - timedelta(days=60), date.today() - timedelta(days=59)]
+
+
+def insert(day, class_ids, camera_id='cam_001', hour=10):
+    dets = [{'class_id': c, 'confidence': 0.9, 'bbox': [0, 0, 10, 10]} for c in class_ids]
+    with database.connect() as conn:
+        conn.execute('INSERT INTO detections (timestamp, detections_json, processing_time, camera_id) '
+                     'VALUES (?, ?, ?, ?)',
+                     (f"{day.isoformat()} {hour:02d}:00:00", json.dumps(dets), 0.05, camera_id))
+
+
+def live_rows():
+    with database.connect() as conn:
+        return conn.execute('SELECT COUNT(*) FROM detections').fetchone()[0]
+
+
+@pytest.fixture
+def history(db):
+    insert(OLD_DAYS[0], [0, 0, 2])
+    insert(OLD_DAYS[0], [0], camera_id='cam_002', hour=15)
+    insert(OLD_DAYS[1], [3, 99])
+    insert(date.today(), [1])
+    return {
+        OLD_DAYS[0].isoformat(): {'apple': 3, 'pear': 1},
+        OLD_DAYS[1].isoformat(): {'watermelon': 1, 'unknown': 1},
+        date.today().isoformat(): {'tangerine': 1},
+    }
+
+
+def test_compact_keeps_query_results(history):
+    assert archive.query_class_counts(OLD_DAYS[0], date.today()) == history
+    assert archive.compact(older_than_days=30) == 3
+    assert live_rows() == 1
+    assert archive.query_class_counts(OLD_DAYS[0], date.today()) == history
+    assert archive.query_camera_counts(OLD_DAYS[0], OLD_DAYS[0]) == {
+        'cam_001': {'apple': 2, 'pear': 1}, 'cam_002': {'apple': 1}}
+
+
+def test_camera_filter_and_hour_buckets(history):
+    archive.compact(older_than_days=30)
+    counts = archive.query_class_counts(OLD_DAYS[0], OLD_DAYS[0], camera_id='cam_002', bucket='hour')
+    assert counts == {f"{OLD_DAYS[0].isoformat()} 15:00": {'apple': 1}}
+
+
+def test_unknown_bucket_is_rejected(db):
+    with pytest.raises(ValueError):
+        archive.query_class_counts(OLD_DAYS[0], OLD_DAYS[0], bucket='week')
+
+
+def test_failed_day_does_not_double_count_earlier_days(history, monkeypatch):
+    write_partition = archive._write_partition
+
+    def fail_on_second_day(day, columns, cameras):
+        if day == OLD_DAYS[1].isoformat():
+            raise OSError('disk full')
+        return write_partition(day, columns, cameras)
+
+    monkeypatch.setattr(archive, '_write_partition', fail_on_second_day)
+    with pytest.raises(OSError):
+        archive.compact(older_than_days=30)
+    # The first day was archived and deleted, the second is still live
+    assert live_rows() == 2
+    assert archive.query_class_counts(OLD_DAYS[0], date.today()) == history
+
+    monkeypatch.setattr(archive, '_write_partition', write_partition)
+    assert archive.compact(older_than_days=30) == 1
+    assert archive.query_class_counts(OLD_DAYS[0], date.today()) == history
+
+
+def test_rows_archived_but_not_deleted_are_counted_once(history):
+    with database.connect() as conn:
+        rows = archive._select_rows(conn, 'timestamp < ?', (f"{OLD_DAYS[1].isoformat()} 00:00:00",))
+    archive._write_partition(OLD_DAYS[0].isoformat(), *archive.rows_to_columns([tuple(r) for r in rows]))
+    assert archive.query_class_counts(OLD_DAYS[0], date.today()) == history
+
+    parts_before = archive._partition_dirs(OLD_DAYS[0], OLD_DAYS[0])
+    archive.compact(older_than_days=30)
+    # The interrupted day is only deleted from SQLite, not written again
+    assert archive._partition_dirs(OLD_DAYS[0], OLD_DAYS[0]) == parts_before
+    assert archive.query_class_counts(OLD_DAYS[0], date.today()) == history
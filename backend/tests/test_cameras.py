@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+import cameras
+import database
+
+
+def test_token_bucket_allows_burst_then_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cameras.time, 'monotonic', lambda: now[0])
+    bucket = cameras.TokenBucket(rate=2, burst=4)
+    assert [bucket.take() for _ in range(5)] == [True, True, True, True, False]
+    now[0] += 0.5
+    assert bucket.take()
+    assert not bucket.take()
+
+
+def _hold_all_slots(scheduler):
+    for _ in range(scheduler.slots):
+        assert scheduler.acquire('holder', timeout=0)
+
+
+def _wait_until_queued(scheduler, count):
+    for _ in range(200):
+        if sum(scheduler.state()['waiting'].values()) == count:
+            return
+        time.sleep(0.005)
+    raise AssertionError(scheduler.state())
+
+
+def test_slots_are_granted_round_robin_across_queues():
+    scheduler = cameras.FairScheduler(slots=1, max_queued=5)
+    _hold_all_slots(scheduler)
+    order = []
+
+    def request(queue_id):
+        assert scheduler.acquire(queue_id, timeout=5)
+        order.append(queue_id)
+        scheduler.release()
+
+    threads = []
+    # The busy camera queues three frames before the quiet one sends its first
+    for queue_id in ('busy', 'busy', 'busy', 'quiet'):
+        thread = threading.Thread(target=request, args=(queue_id,))
+        thread.start()
+        threads.append(thread)
+        _wait_until_queued(scheduler, len(threads))
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == ['busy', 'quiet', 'busy', 'busy']
+
+
+def test_full_queue_and_timeout_are_rejected():
+    scheduler = cameras.FairScheduler(slots=1, max_queued=1)
+    _hold_all_slots(scheduler)
+    waiter = threading.Thread(target=scheduler.acquire, args=('cam',), kwargs={'timeout': 0.5})
+    waiter.start()
+    _wait_until_queued(scheduler, 1)
+    assert not scheduler.acquire('cam', timeout=0)
+    # A larger per-call limit (manual uploads) still gets a place in the queue
+    assert not scheduler.acquire('cam', timeout=0.05, max_queued=4)
+    waiter.join(5)
+    assert scheduler.state()['waiting'] == {}
+    scheduler.release()
+    assert scheduler.acquire('cam', timeout=0)
+
+
+@pytest.fixture
+def registry(db):
+    return cameras.CameraRegistry()
+
+
+def test_registry_flushes_heartbeats_to_camera_status(registry):
+    assert registry.admit('bin-1', 'Kitchen')
+    registry.add_detections('bin-1', 3)
+    assert registry.flush() == 1
+    assert registry.flush() == 0
+    reloaded = cameras.CameraRegistry()
+    reloaded.load()
+    [camera] = reloaded.snapshot()
+    assert (camera['camera_id'], camera['location'], camera['total_detections']) == ('bin-1', 'Kitchen', 3)
+
+
+def test_touch_records_a_heartbeat_without_spending_budget(registry, monkeypatch):
+    monkeypatch.setattr(cameras, 'CAMERA_BURST', 1)
+    for _ in range(5):
+        assert registry.touch('bin-1', 'Kitchen')
+    assert registry.admit('bin-1')
+    [camera] = registry.snapshot()
+    assert (camera['status'], camera['location'], camera['frames']) == ('online', 'Kitchen', 1)
+    monkeypatch.setattr(cameras, 'CAMERA_MAX_AUTO_REGISTERED', 1)
+    assert not registry.touch('bin-2')
+
+def test_unknown_cameras_are_capped_and_expire(registry, monkeypatch):
+    monkeypatch.setattr(cameras, 'CAMERA_MAX_AUTO_REGISTERED', 2)
+    assert registry.admit('bin-1') and registry.admit('bin-2')
+    assert registry.admit('bin-3') is None
+    registry.add_detections('bin-3', 1)
+    assert [c['camera_id'] for c in registry.snapshot()] == ['bin-1', 'bin-2']
+    registry.flush()
+
+    monkeypatch.setattr(cameras, 'CAMERA_AUTO_EXPIRE_SECONDS', -1)
+    registry.flush()
+    assert registry.snapshot() == []
+    assert registry.admit('bin-3')
+    reloaded = cameras.CameraRegistry()
+    reloaded.load()
+    assert [c['camera_id'] for c in reloaded.snapshot()] == []
+
+
+def test_cameras_in_camera_status_are_known_without_auto_registration(registry, monkeypatch):
+    with database.connect() as conn:
+        conn.execute("INSERT INTO camera_status (camera_id, location) VALUES ('bin-1', 'Kitchen')")
+    monkeypatch.setattr(cameras, 'CAMERA_MAX_AUTO_REGISTERED', 0)
+    monkeypatch.setattr(cameras, 'CAMERA_AUTO_EXPIRE_SECONDS', -1)
+    registry.load()
+    assert registry.admit('bin-1')
+    assert registry.admit('bin-2') is None
+    registry.flush()
+    assert [c['camera_id'] for c in registry.snapshot()] == ['bin-1']
+
+
+def test_upload_limiter_budgets_each_client_and_forgets_idle_ones(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cameras.time, 'monotonic', lambda: now[0])
+    limiter = cameras.ClientRateLimiter(rate=1, burst=2)
+    assert limiter.allow('upload:a') and limiter.allow('upload:a')
+    assert not limiter.allow('upload:a')
+    assert limiter.allow('upload:b')
+    now[0] += 5
+    assert limiter.allow('upload:c')
+    assert limiter.state()['clients'] == 1
+    assert limiter.state()['rejected'] == 1
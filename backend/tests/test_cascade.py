@@ -0,0 +1,44 @@
+import importlib
+
+import pytest
+
+import cascade
+
+
+def test_overlapping_boxes_are_fused_by_confidence(det, class_names):
+    fused = cascade.weighted_box_fusion(
+        [[det([0, 0, 100, 100], 0.5)], [det([10, 10, 110, 110], 0.5)]],
+        [1.0, 1.0], class_names, iou_threshold=0.5)
+    assert len(fused) == 1
+    assert fused[0]['bbox'] == [5, 5, 105, 105]
+    assert fused[0]['confidence'] == pytest.approx(0.5)
+
+
+def test_single_model_box_is_damped_by_its_weight_share(det, class_names):
+    fused = cascade.weighted_box_fusion([[det([0, 0, 10, 10], 0.9)], []],
+                                        [1.0, 2.0], class_names)
+    assert fused[0]['confidence'] == pytest.approx(0.3)
+
+
+def test_boxes_of_different_classes_are_kept_apart(det, class_names):
+    fused = cascade.weighted_box_fusion(
+        [[det([0, 0, 10, 10], 0.8)], [det([0, 0, 10, 10], 0.8, class_id=1)]],
+        [1.0, 1.0], class_names)
+    assert sorted(d['class_name'] for d in fused) == ['apple', 'pear']
+
+
+def test_escalation_reason(det):
+    assert cascade.escalation_reason([det([0, 0, 1, 1], 0.9)], 0.5, 8) is None
+    assert cascade.escalation_reason([det([0, 0, 1, 1], 0.2)], 0.5, 8) == 'low_confidence'
+    assert cascade.escalation_reason([det([0, 0, 1, 1], 0.9)] * 3, 0.5, 2) == 'crowded'
+
+
+@pytest.mark.parametrize('value', ['1', '1,2,3', '-1,2'])
+def test_invalid_wbf_weights_fall_back_to_default(monkeypatch, value):
+    monkeypatch.setenv('WBF_WEIGHTS', value)
+    try:
+        module = importlib.reload(cascade)
+        assert module.WBF_WEIGHTS == module.DEFAULT_WBF_WEIGHTS
+    finally:
+        monkeypatch.delenv('WBF_WEIGHTS')
+        importlib.reload(cascade)
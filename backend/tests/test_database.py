@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+import database
+
+
+def event(class_name, estimated_kg=0.2):
+    return {'camera_id': 'cam', 'track_id': 1, 'class_id': 0, 'class_name': class_name, 'confidence': 0.9,
+            'bbox': [0, 0, 10, 10], 'first_seen': '2026-01-01T00:00:00', 'estimated_kg': estimated_kg}
+
+
+def test_item_events_add_up_in_daily_metrics(db):
+    database.record_item_events([event('apple'), event('pear')])
+    database.record_item_events([event('apple', estimated_kg=None)])
+    with database.connect() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM waste_events').fetchone()[0] == 3
+        row = conn.execute('SELECT * FROM daily_metrics').fetchone()
+    assert row['total_detections'] == 3
+    assert row['total_waste_kg'] == pytest.approx(0.4)
+    assert row['most_wasted_item'] == 'apple'
+    assert json.loads(row['waste_by_category_json']) == {'apple': 2, 'pear': 1}
+
+
+def test_init_db_is_idempotent(db):
+    database.init_db()
+    database.record_item_events([])
+    with database.connect() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM daily_metrics').fetchone()[0] == 0
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from evaluate_model import compute_map, load_labels, match_predictions
+
+
+def record(pred_boxes, pred_cls, pred_conf, gt_boxes, gt_cls):
+    return {
+        'pred_boxes': np.array(pred_boxes, dtype=np.float32).reshape(-1, 4),
+        'pred_cls': np.array(pred_cls, dtype=np.int64),
+        'pred_conf': np.array(pred_conf, dtype=np.float32),
+        'gt_boxes': np.array(gt_boxes, dtype=np.float32).reshape(-1, 4),
+        'gt_cls': np.array(gt_cls, dtype=np.int64),
+    }
+
+
+def test_perfect_predictions_score_one():
+    rec = record([[0, 0, 10, 10], [20, 20, 40, 40]], [0, 1], [0.9, 0.8],
+                 [[0, 0, 10, 10], [20, 20, 40, 40]], [0, 1])
+    result = compute_map([rec], num_classes=2)
+    assert result['mAP50'] == pytest.approx(1.0)
+    assert result['mAP50-95'] == pytest.approx(1.0)
+
+
+def test_higher_scored_false_positive_halves_precision():
+    rec = record([[50, 50, 60, 60], [0, 0, 10, 10]], [0, 0], [0.9, 0.5],
+                 [[0, 0, 10, 10]], [0])
+    result = compute_map([rec], num_classes=1)
+    assert result['per_class']['apple']['mAP50'] == pytest.approx(0.5)
+
+
+def test_duplicate_prediction_matches_once():
+    tp = match_predictions(np.array([[0, 0, 10, 10], [0, 0, 10, 10]], dtype=np.float32),
+                           np.array([0, 0]), np.array([0.6, 0.9]),
+                           np.array([[0, 0, 10, 10]], dtype=np.float32), np.array([0]))
+    assert tp[:, 0].tolist() == [False, True]
+
+
+def test_wrong_class_is_not_a_match():
+    rec = record([[0, 0, 10, 10]], [1], [0.9], [[0, 0, 10, 10]], [0])
+    result = compute_map([rec], num_classes=2)
+    assert result['mAP50'] == 0.0
+    # Classes without ground truth are reported but not averaged
+    assert result['per_class']['tangerine']['predictions'] == 1
+
+
+def test_load_labels_converts_yolo_to_pixels(tmp_path):
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'labels').mkdir()
+    (tmp_path / 'labels' / 'a.txt').write_text('2 0.5 0.5 0.5 0.25\n')
+    boxes, cls = load_labels(tmp_path / 'images' / 'a.jpg', width=200, height=100)
+    assert cls.tolist() == [2]
+    assert boxes.tolist() == [[50.0, 37.5, 150.0, 62.5]]
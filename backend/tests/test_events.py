@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+
+import events
+
+
+def test_metrics_deltas_are_coalesced_for_slow_readers():
+    hub = events.EventHub()
+    subscriber = hub.subscribe()
+    hub.publish('metrics', {'total_detections': 2, 'class_counts': {'apple': 2}})
+    hub.publish('metrics', {'total_detections': 1, 'class_counts': {'apple': 1, 'pear': 1}})
+    assert subscriber.drain() == [('metrics', {'total_detections': 3, 'class_counts': {'apple': 3, 'pear': 1}})]
+
+
+def test_full_buffer_drops_oldest_and_reports_overflow():
+    hub = events.EventHub()
+    subscriber = hub.subscribe()
+    subscriber.events = events.deque(maxlen=2)
+    for i in range(5):
+        hub.publish('detection', {'n': i})
+    items = subscriber.drain()
+    assert items[0] == ('overflow', {'dropped': 3})
+    assert [data['n'] for _, data in items[1:]] == [3, 4]
+
+
+def test_topics_and_subscriber_limit():
+    hub = events.EventHub(max_subscribers=1)
+    subscriber = hub.subscribe(['metrics'])
+    assert hub.subscribe() is None
+    hub.publish('detection', {})
+    assert subscriber.drain() == []
+    hub.unsubscribe(subscriber)
+    assert hub.subscribe() is not None
+
+
+async def _read_event(reader, topic):
+    while True:
+        line = await asyncio.wait_for(reader.readline(), 5)
+        if line.startswith(f'event: {topic}'.encode()):
+            return json.loads((await reader.readline())[len(b'data: '):])
+
+
+def test_publisher_to_sse_stream_round_trip():
+    async def scenario():
+        server = events.EventServer()
+        http_server, publish_server = await server.start('127.0.0.1', 0, '127.0.0.1', 0)
+        http_port = http_server.sockets[0].getsockname()[1]
+        publish_port = publish_server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', http_port)
+        writer.write(b'GET /api/events?topics=detection HTTP/1.1\r\nHost: x\r\n\r\n')
+        await writer.drain()
+        assert b'200 OK' in await reader.readline()
+        await _read_event(reader, 'hello')
+
+        publisher = events.EventPublisher('127.0.0.1', publish_port)
+        publisher.publish('detection', {'total_detections': 4})
+        assert await _read_event(reader, 'detection') == {'total_detections': 4}
+        assert publisher.stats()['dropped'] == 0
+
+        writer.close()
+        for _ in range(50):
+            if server.hub.stats()['subscribers'] == 0:
+                break
+            server.hub.publish('detection', {})
+            await asyncio.sleep(0.05)
+        assert server.hub.stats()['subscribers'] == 0
+        http_server.close()
+        publish_server.close()
+
+    asyncio.run(scenario())
+
+
+def test_publisher_drops_events_while_event_server_is_down():
+    with events.socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    publisher = events.EventPublisher('127.0.0.1', port)
+    publisher.publish('metrics', {'total_detections': 1})
+    for _ in range(100):
+        if publisher.stats()['dropped']:
+            break
+        time.sleep(0.01)
+    assert publisher.stats() == dict(publisher.stats(), connected=False, sent=0, dropped=1)
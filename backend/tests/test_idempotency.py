@@ -0,0 +1,75 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import idempotency
+
+
+@pytest.fixture
+def store(db):
+    store = idempotency.IdempotencyStore(ttl_seconds=60, memory_entries=4)
+    store.init_db()
+    return store
+
+
+def fake_request(headers=None, form=None):
+    return SimpleNamespace(headers=headers or {}, form=form or {})
+
+
+def test_request_key_prefers_explicit_key():
+    assert idempotency.request_key(fake_request({'Idempotency-Key': 'abc'}), 'predict:', 'f00') == 'predict::key:abc'
+    assert idempotency.request_key(fake_request(form={'camera_id': 'cam'}), 'predict:', 'f00') == 'predict::sha256:cam:f00'
+
+
+def test_concurrent_duplicates_compute_once(store):
+    computed = []
+    responses = []
+
+    def handle():
+        response = store.begin('k')
+        if response is None:
+            computed.append(1)
+            time.sleep(0.1)
+            response = {'detections': 3}
+            store.complete('k', response)
+        responses.append(response)
+
+    threads = [threading.Thread(target=handle) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(computed) == 1
+    assert responses == [{'detections': 3}] * 8
+    assert store.stats()['in_flight'] == 0
+
+
+def test_failed_owner_hands_the_key_to_a_waiter(store):
+    assert store.begin('k') is None
+    claimed = threading.Event()
+
+    def waiter():
+        if store.begin('k') is None:
+            claimed.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    assert not claimed.is_set()
+    store.release('k')
+    thread.join(5)
+    assert claimed.is_set()
+
+
+def test_responses_survive_a_restart_and_expire(store):
+    store.begin('k')
+    store.complete('k', {'ok': True})
+    restarted = idempotency.IdempotencyStore(ttl_seconds=60)
+    assert restarted.begin('k') == {'ok': True}
+
+    store.ttl_seconds = -1
+    store.begin('old')
+    store.complete('old', {'ok': True})
+    assert idempotency.IdempotencyStore().begin('old') is None
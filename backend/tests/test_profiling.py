@@ -0,0 +1,67 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import profiling
+
+
+def busy_stage(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_folds_other_threads_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_stage, args=(stop,), name='worker thread')
+    worker.start()
+    try:
+        folded, samples = profiling.SamplingProfiler().run(0.2, interval_ms=5)
+    finally:
+        stop.set()
+        worker.join()
+    assert samples > 0
+    lines = folded.strip().split('\n')
+    worker_lines = [line for line in lines if line.startswith('worker_thread;')]
+    assert any(':busy_stage:' in line for line in worker_lines)
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert ' ' not in stack and int(count) > 0
+
+
+def test_only_one_profile_runs_at_a_time():
+    profiler = profiling.SamplingProfiler()
+    started = threading.Thread(target=profiler.run, args=(0.3,))
+    started.start()
+    time.sleep(0.05)
+    assert profiler.run(0.1) is None
+    started.join()
+
+
+def test_trace_laps_and_slow_request_ring_buffer():
+    log = profiling.SlowRequestLog(threshold_ms=10, size=2)
+    fast = profiling.RequestTrace('/api/predict')
+    assert not log.record(fast, 200)
+
+    for i in range(3):
+        trace = profiling.RequestTrace(f'/api/{i}')
+        trace.meta['width'] = 640
+        time.sleep(0.015)
+        trace.lap('inference')
+        assert log.record(trace, 200)
+    entries = log.entries()
+    assert [e['endpoint'] for e in entries] == ['/api/2', '/api/1']
+    assert entries[0]['stages'][0]['stage'] == 'inference'
+    assert entries[0]['stages'][0]['ms'] >= 10
+    assert entries[0]['image'] == {'width': 640}
+    assert log.recorded == 3
+
+
+def test_admin_endpoints_need_a_configured_matching_token(monkeypatch):
+    request = SimpleNamespace(headers={'X-Admin-Token': 'secret'})
+    monkeypatch.setattr(profiling, 'ADMIN_TOKEN', '')
+    assert not profiling.is_admin(request)
+    assert not profiling.is_admin(SimpleNamespace(headers={}))
+    monkeypatch.setattr(profiling, 'ADMIN_TOKEN', 'secret')
+    assert profiling.is_admin(request)
+    assert not profiling.is_admin(SimpleNamespace(headers={'X-Admin-Token': 'wrong'}))
+    assert not profiling.is_admin(SimpleNamespace(headers={'X-Admin-Token': 's\xe9cret'}))
@@ -0,0 +1,43 @@
+import io
+import threading
+import time
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+import resources
+
+
+def encode(width, height, fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_frame_cost_counts_decoded_and_annotated_frames():
+    data = encode(40, 30)
+    assert resources.frame_cost(data) == len(data) + 2 * 40 * 30 * 3
+
+
+def test_unreadable_or_oversized_headers_are_rejected(monkeypatch):
+    assert resources.frame_cost(b'not an image') is None
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 100)
+    assert resources.frame_cost(encode(40, 30)) is None
+
+
+def test_budget_blocks_until_release_and_rejects_oversized():
+    budget = resources.FrameBudget(limit_bytes=100)
+    assert not budget.reserve(101, timeout=0)
+    assert budget.reserve(60, timeout=0)
+    assert not budget.reserve(60, timeout=0.01)
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(budget.reserve(60, timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    budget.release(60)
+    waiter.join(5)
+    assert result == [True]
+    assert budget.state()['rejected'] == 2
+    assert budget.peak == 60
@@ -0,0 +1,89 @@
+import pytest
+
+import run_registry
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch):
+    runs_dir = tmp_path / 'runs' / 'detect'
+    runs_dir.mkdir(parents=True)
+    monkeypatch.setattr(run_registry, 'RUNS_DIR', runs_dir)
+    monkeypatch.setattr(run_registry, 'REGISTRY_PATH', tmp_path / 'runs' / 'registry.json')
+    return runs_dir
+
+
+def make_run(runs_dir, name, map50_95=None):
+    run_dir = runs_dir / name
+    (run_dir / 'weights').mkdir(parents=True)
+    (run_dir / 'weights' / 'last.pt').write_bytes(b'weights')
+    if map50_95 is not None:
+        (run_dir / 'results.csv').write_text(
+            'epoch,metrics/mAP50(B),metrics/mAP50-95(B)\n'
+            f'1,0.5,{map50_95}\n')
+    return run_dir
+
+
+def test_rebuild_orders_runs_by_index(runs):
+    make_run(runs, 'fruit-detection10', 0.4)
+    make_run(runs, 'fruit-detection2', 0.6)
+    registry = run_registry.rebuild()
+    assert registry['latest'] == 'fruit-detection10'
+    assert registry['best'] == 'fruit-detection2'
+
+
+def test_interrupted_run_becomes_latest(runs):
+    make_run(runs, 'fruit-detection2', 0.5)
+    run_registry.register_run(runs / 'fruit-detection2')
+    # Training of the next run was interrupted before register_run()
+    make_run(runs, 'fruit-detection3')
+    run_registry.discover_runs()
+    entry = run_registry.get_run('latest')
+    assert entry['name'] == 'fruit-detection3'
+    assert entry['status'] == 'discovered'
+    assert run_registry.get_run('best')['name'] == 'fruit-detection2'
+
+
+def test_started_run_is_latest_until_finished(runs):
+    make_run(runs, 'fruit-detection', 0.5)
+    run_registry.register_run(runs / 'fruit-detection')
+    run_dir = make_run(runs, 'fruit-detection2')
+    assert run_registry.start_run(run_dir)['status'] == 'running'
+    assert run_registry.get_run('latest')['name'] == 'fruit-detection2'
+    (run_dir / 'results.csv').write_text('epoch,metrics/mAP50-95(B)\n1,0.7\n')
+    assert run_registry.register_run(run_dir)['status'] == 'finished'
+    assert run_registry.get_run('best')['name'] == 'fruit-detection2'
+
+
+def test_promotion_survives_rebuild(runs):
+    make_run(runs, 'fruit-detection', 0.5)
+    make_run(runs, 'fruit-detection2', 0.3)
+    run_registry.rebuild()
+    run_registry.mark_promoted('fruit-detection')
+    registry = run_registry.rebuild()
+    assert registry['promoted'] == 'fruit-detection'
+    assert not registry['runs']['fruit-detection2']['promoted']
+
+
+def test_lookups_read_only_the_manifest(runs, monkeypatch):
+    make_run(runs, 'fruit-detection', 0.5)
+    run_registry.rebuild()
+
+    def no_scan():
+        raise AssertionError('runs/detect scanned on lookup')
+
+    monkeypatch.setattr(run_registry, '_scan_runs_dir', no_scan)
+    make_run(runs, 'fruit-detection2')
+    assert run_registry.get_run('best')['name'] == 'fruit-detection'
+    assert run_registry.get_run('latest')['name'] == 'fruit-detection'
+
+
+def test_weights_of_an_interrupted_started_run_are_found_on_disk(runs):
+    run_dir = runs / 'fruit-detection'
+    run_dir.mkdir()
+    run_registry.start_run(run_dir)
+    entry = run_registry.get_run('latest')
+    assert entry['weights'] == {}
+    assert run_registry.weights_path(entry) is None
+    (run_dir / 'weights').mkdir()
+    (run_dir / 'weights' / 'last.pt').write_bytes(b'weights')
+    assert run_registry.weights_path(entry) == run_dir / 'weights' / 'last.pt'
@@ -0,0 +1,75 @@
+import tracking
+
+
+def make_tracker(**kwargs):
+    options = dict(high_confidence=0.5, low_confidence=0.1, iou_threshold=0.3, min_hits=3, max_age=30)
+    options.update(kwargs)
+    return tracking.ByteTracker('cam', **options)
+
+
+def test_stationary_item_is_counted_once(det):
+    tracker = make_tracker()
+    events = []
+    for _ in range(100):
+        _, new_items = tracker.update([det([100, 100, 150, 150])])
+        events.extend(new_items)
+    assert len(events) == 1
+    assert events[0]['class_name'] == 'apple'
+    assert tracker.items_counted == 1
+
+
+def test_moving_item_keeps_its_track_id(det):
+    tracker = make_tracker()
+    ids = set()
+    for step in range(20):
+        tracked, _ = tracker.update([det([100 + 5 * step, 100, 150 + 5 * step, 150])])
+        ids.update(d['track_id'] for d in tracked)
+    assert len(ids) == 1
+
+
+def test_two_items_are_counted_separately(det):
+    tracker = make_tracker()
+    events = []
+    for _ in range(5):
+        _, new_items = tracker.update([det([0, 0, 50, 50]), det([200, 200, 250, 250], class_id=1)])
+        events.extend(new_items)
+    assert sorted(e['class_name'] for e in events) == ['apple', 'pear']
+
+
+def test_confirmed_track_survives_short_occlusion(det):
+    tracker = make_tracker()
+    for _ in range(3):
+        tracker.update([det([0, 0, 50, 50])])
+    for _ in range(5):
+        tracker.update([])
+    _, new_items = tracker.update([det([0, 0, 50, 50])])
+    assert new_items == []
+    assert tracker.items_counted == 1
+
+
+def test_tentative_track_is_dropped_on_first_miss(det):
+    tracker = make_tracker()
+    tracker.update([det([0, 0, 50, 50])])
+    tracker.update([])
+    assert tracker.tracks == []
+    # Hits on either side of a gap are not consecutive, so nothing is confirmed
+    events = []
+    for frame in ([det([0, 0, 50, 50])], [], [det([0, 0, 50, 50])], [det([0, 0, 50, 50])]):
+        events.extend(tracker.update(frame)[1])
+    assert events == []
+
+
+def test_low_confidence_detection_does_not_start_a_track(det):
+    tracker = make_tracker()
+    tracker.update([det([0, 0, 50, 50], confidence=0.3)])
+    assert tracker.tracks == []
+
+
+def test_registry_drops_idle_trackers(det, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(tracking.time, 'monotonic', lambda: now[0])
+    registry = tracking.TrackerRegistry(idle_reset_seconds=10)
+    registry.update('cam-1', [det([0, 0, 50, 50])])
+    now[0] += 11
+    registry.update('cam-2', [det([0, 0, 50, 50])])
+    assert [t['camera_id'] for t in registry.state()] == ['cam-2']
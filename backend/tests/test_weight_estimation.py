@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pytest
+
+import weight_estimation
+
+CLASS_NAMES = ['apple', 'watermelon']
+
+
+def test_calibrated_box_uses_ellipsoid_volume():
+    estimator = weight_estimation.WeightEstimator(CLASS_NAMES, calibration={'cam': 10.0})
+    # 10 cm x 10 cm apple: pi/6 * 1000 cm^3 * 0.8 g/cm^3
+    [mass] = estimator.estimate([0], [[0, 0, 100, 100]], estimator.pixels_per_cm('cam'))
+    assert mass == pytest.approx(np.pi / 6 * 0.8)
+
+
+def test_masses_are_clipped_to_class_range():
+    estimator = weight_estimation.WeightEstimator(CLASS_NAMES, calibration={})
+    masses = estimator.estimate([0, 0], [[0, 0, 1, 1], [0, 0, 1000, 1000]], 10.0)
+    assert masses.tolist() == [0.05, 0.5]
+
+
+def test_uncalibrated_camera_and_unknown_class_use_typical_mass(monkeypatch):
+    monkeypatch.setattr(weight_estimation, 'DEFAULT_PIXELS_PER_CM', None)
+    estimator = weight_estimation.WeightEstimator(CLASS_NAMES, calibration={})
+    detections = [{'class_id': 1, 'bbox': [0, 0, 5, 5]}, {'class_id': 7, 'bbox': [0, 0, 5, 5]}]
+    assert estimator.annotate(detections, 'unknown-cam') == pytest.approx(5.2)
+    assert [d['estimated_kg'] for d in detections] == [5.0, 0.2]
+
+
+def test_per_detection_scales_in_one_batch():
+    estimator = weight_estimation.WeightEstimator(CLASS_NAMES, calibration={})
+    masses = estimator.estimate([0, 0], [[0, 0, 100, 100], [0, 0, 100, 100]], np.array([10.0, 20.0]))
+    assert masses[0] == pytest.approx(8 * masses[1])
+
+
+def test_load_calibration(tmp_path):
+    path = tmp_path / 'camera_calibration.json'
+    path.write_text(json.dumps({'bin-1': {'pixels_per_cm': 12.5}}))
+    assert weight_estimation.load_calibration(str(path)) == {'bin-1': 12.5}
+    assert weight_estimation.load_calibration(str(tmp_path / 'missing.json')) == {}
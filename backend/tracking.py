@@ -0,0 +1,244 @@
+"""
+Lightweight multi-object tracking across camera frames.
+
+A ByteTrack-style tracker: every track carries a constant-velocity Kalman
+filter over (cx, cy, w, h), high-confidence detections are associated with
+the predicted tracks first and low-confidence detections are then used to
+keep already-known tracks alive. A track becomes an item once it has been
+seen in min_hits consecutive frames, and a single "new item" event is emitted
+for it, so an apple that sits in the bin for 100 frames is counted once.
+Tentative tracks are dropped on their first miss; confirmed tracks survive
+max_age missed frames.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+TRACKING_ENABLED = os.environ.get('TRACKING_ENABLED', '0') == '1'
+TRACK_HIGH_CONFIDENCE = float(os.environ.get('TRACK_HIGH_CONFIDENCE', '0.5'))
+TRACK_LOW_CONFIDENCE = float(os.environ.get('TRACK_LOW_CONFIDENCE', '0.1'))
+TRACK_IOU_THRESHOLD = float(os.environ.get('TRACK_IOU_THRESHOLD', '0.3'))
+TRACK_MIN_HITS = int(os.environ.get('TRACK_MIN_HITS', '3'))
+TRACK_MAX_AGE = int(os.environ.get('TRACK_MAX_AGE', '30'))  # frames a confirmed track survives unseen
+TRACK_IDLE_RESET_SECONDS = float(os.environ.get('TRACK_IDLE_RESET_SECONDS', '600'))
+
+# Constant-velocity model over state (cx, cy, w, h, vcx, vcy, vw, vh)
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8)
+
+
+def _xyxy_to_cxcywh(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+
+def _cxcywh_to_xyxy(z):
+    cx, cy, w, h = z[:4]
+    return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between two (N, 4) / (M, 4) arrays of xyxy boxes"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _greedy_match(iou, threshold):
+    """Greedy highest-IoU-first assignment; returns matched (row, col) pairs"""
+    matches = []
+    if iou.size == 0:
+        return matches
+    iou = iou.copy()
+    while True:
+        r, c = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[r, c] < threshold:
+            break
+        matches.append((int(r), int(c)))
+        iou[r, :] = -1
+        iou[:, c] = -1
+    return matches
+
+
+class Track:
+    """One tracked object with its Kalman state"""
+
+    def __init__(self, track_id, detection):
+        z = _xyxy_to_cxcywh(detection['bbox'])
+        self.track_id = track_id
+        self.class_id = detection['class_id']
+        self.class_name = detection['class_name']
+        self.confidence = detection['confidence']
+        self.estimated_kg = detection.get('estimated_kg')
+        self.x = np.concatenate([z, np.zeros(4)])
+        scale = max(z[2], z[3], 1.0)
+        self.P = np.diag([scale, scale, scale, scale, 10 * scale, 10 * scale, 10 * scale, 10 * scale]) ** 2 / 100
+        self.hits = 1
+        self.misses = 0
+        self.confirmed = False
+        self.first_seen = datetime.now()
+
+    def _noise(self):
+        scale = max(self.x[2], self.x[3], 1.0)
+        q = np.diag([0.05, 0.05, 0.05, 0.05, 0.01, 0.01, 0.01, 0.01]) * scale
+        r = np.diag([0.1, 0.1, 0.1, 0.1]) * scale
+        return q ** 2, r ** 2
+
+    def predict(self):
+        q, _ = self._noise()
+        self.x = _F @ self.x
+        self.P = _F @ self.P @ _F.T + q
+        return _cxcywh_to_xyxy(self.x)
+
+    def update(self, detection):
+        _, r = self._noise()
+        z = _xyxy_to_cxcywh(detection['bbox'])
+        s = _H @ self.P @ _H.T + r
+        k = self.P @ _H.T @ np.linalg.inv(s)
+        self.x = self.x + k @ (z - _H @ self.x)
+        self.P = (np.eye(8) - k @ _H) @ self.P
+        self.confidence = detection['confidence']
+        if detection.get('estimated_kg') is not None:
+            self.estimated_kg = detection['estimated_kg']
+        self.hits += 1
+        self.misses = 0
+
+    @property
+    def bbox(self):
+        return [int(v) for v in _cxcywh_to_xyxy(self.x)]
+
+
+class ByteTracker:
+    """Per-camera tracker that turns per-frame detections into item events"""
+
+    def __init__(self, camera_id, high_confidence=None, low_confidence=None,
+                 iou_threshold=None, min_hits=None, max_age=None):
+        self.camera_id = camera_id
+        self.high_confidence = TRACK_HIGH_CONFIDENCE if high_confidence is None else high_confidence
+        self.low_confidence = TRACK_LOW_CONFIDENCE if low_confidence is None else low_confidence
+        self.iou_threshold = TRACK_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        self.min_hits = TRACK_MIN_HITS if min_hits is None else min_hits
+        self.max_age = TRACK_MAX_AGE if max_age is None else max_age
+        self.tracks = []
+        self.next_id = 1
+        self.frames = 0
+        self.items_counted = 0
+        self.last_update = time.monotonic()
+
+    def _associate(self, tracks, predicted, detections):
+        """Class-aware IoU association; returns matches and leftover indices"""
+        if not tracks or not detections:
+            return [], list(range(len(tracks))), list(range(len(detections)))
+        det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float64)
+        iou = iou_matrix(predicted, det_boxes)
+        same_class = np.array([[t.class_id == d['class_id'] for d in detections] for t in tracks])
+        iou[~same_class] = 0.0
+        matches = _greedy_match(iou, self.iou_threshold)
+        matched_t = {t for t, _ in matches}
+        matched_d = {d for _, d in matches}
+        return (matches,
+                [i for i in range(len(tracks)) if i not in matched_t],
+                [i for i in range(len(detections)) if i not in matched_d])
+
+    def update(self, detections):
+        """
+        Advance the tracker by one frame.
+
+        Returns (tracked, new_items): the detections that belong to a track,
+        each with a 'track_id', and one event per track confirmed this frame.
+        """
+        self.frames += 1
+        self.last_update = time.monotonic()
+        predicted = np.array([t.predict() for t in self.tracks]).reshape(-1, 4)
+
+        high = [d for d in detections if d['confidence'] >= self.high_confidence]
+        low = [d for d in detections if self.low_confidence <= d['confidence'] < self.high_confidence]
+
+        # First pass: high-confidence detections against every track
+        matches, rest_t, rest_high = self._associate(self.tracks, predicted, high)
+        tracked = []
+        for t, d in matches:
+            self.tracks[t].update(high[d])
+            tracked.append((self.tracks[t], high[d]))
+
+        # Second pass: low-confidence detections only keep existing tracks alive
+        remaining = [self.tracks[i] for i in rest_t]
+        low_matches, rest_low_t, _ = self._associate(remaining, predicted[rest_t], low)
+        for t, d in low_matches:
+            remaining[t].update(low[d])
+            tracked.append((remaining[t], low[d]))
+        for i in rest_low_t:
+            remaining[i].misses += 1
+
+        # Unmatched high-confidence detections start new tentative tracks
+        for d in rest_high:
+            track = Track(self.next_id, high[d])
+            self.next_id += 1
+            self.tracks.append(track)
+            tracked.append((track, high[d]))
+
+        new_items = []
+        for track, _ in tracked:
+            if not track.confirmed and track.hits >= self.min_hits:
+                track.confirmed = True
+                self.items_counted += 1
+                new_items.append({
+                    'camera_id': self.camera_id,
+                    'track_id': track.track_id,
+                    'class_id': track.class_id,
+                    'class_name': track.class_name,
+                    'confidence': track.confidence,
+                    'bbox': track.bbox,
+                    'estimated_kg': track.estimated_kg,
+                    'first_seen': track.first_seen.isoformat(timespec='seconds'),
+                })
+
+        # Unconfirmed tracks must be seen every frame, otherwise a stale one
+        # could later be confirmed by a different object
+        self.tracks = [t for t in self.tracks
+                       if t.misses == 0 or (t.confirmed and t.misses <= self.max_age)]
+        return [dict(d, track_id=t.track_id) for t, d in tracked], new_items
+
+    def state(self):
+        return {
+            'camera_id': self.camera_id,
+            'frames': self.frames,
+            'active_tracks': len(self.tracks),
+            'confirmed_tracks': sum(1 for t in self.tracks if t.confirmed),
+            'items_counted': self.items_counted,
+        }
+
+
+class TrackerRegistry:
+    """Holds one tracker per camera; idle cameras start over with fresh state"""
+
+    def __init__(self, idle_reset_seconds=None):
+        self.idle_reset_seconds = TRACK_IDLE_RESET_SECONDS if idle_reset_seconds is None else idle_reset_seconds
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def update(self, camera_id, detections):
+        with self._lock:
+            tracker = self._trackers.get(camera_id)
+            now = time.monotonic()
+            if tracker is None or now - tracker.last_update > self.idle_reset_seconds:
+                # Idle trackers would start over anyway, so drop them instead of keeping one per camera ever seen
+                self._trackers = {c: t for c, t in self._trackers.items()
+                                  if now - t.last_update <= self.idle_reset_seconds}
+                tracker = ByteTracker(camera_id)
+                self._trackers[camera_id] = tracker
+            return tracker.update(detections)
+
+    def state(self):
+        with self._lock:
+            return [t.state() for t in self._trackers.values()]
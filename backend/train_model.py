@@ -9,6 +9,16 @@ import sys
 from pathlib import Path
 import re
 
+import run_registry
+
+def register_started_run(trainer):
+    """ultralytics on_train_start callback: record the run before the first epoch"""
+    try:
+        entry = run_registry.start_run(trainer.save_dir)
+        print(f"🗂️  Registered run {entry['name']} as running")
+    except Exception as e:
+        print(f"⚠️  Could not register started run: {e}")
+
 def install_dependencies():
     """Install required dependencies"""
     print("📦 Installing dependencies...")
@@ -120,37 +130,28 @@ def train_model():
             print(f"💻 CUDA not available, using CPU: {device}")
         
         model = YOLO("yolov8s.pt")
+        model.add_callback("on_train_start", register_started_run)
         
-        # Check for existing training runs to resume from
-        runs_dir = Path("runs/detect")
-        existing_runs = []
-        if runs_dir.exists():
-            for run_dir in runs_dir.iterdir():
-                if run_dir.is_dir() and run_dir.name.startswith("fruit-detection"):
-                    existing_runs.append(run_dir.name)
-        
-        # Sort runs numerically to find the latest (e.g., 20 > 9)
-        def _run_index(name: str) -> int:
-            try:
-                suffix = name.replace("fruit-detection", "")
-                return int(suffix) if suffix.isdigit() else 0
-            except Exception:
-                return -1
-        existing_runs.sort(key=_run_index)
-        latest_run = existing_runs[-1] if existing_runs else None
+        # Check for existing training runs to resume from (including runs interrupted
+        # before the registry heard of them)
+        run_registry.discover_runs()
+        latest_entry = run_registry.get_run('latest')
+        latest_run = latest_entry['name'] if latest_entry else None
+        latest_dir = Path(latest_entry['path']) if latest_entry else None
         
         if latest_run:
             print(f"🔄 Found existing training run: {latest_run}")
-            print(f"📁 Continuing training from: runs/detect/{latest_run}/weights/last.pt")
+            print(f"📁 Continuing training from: {latest_dir.as_posix()}/weights/last.pt")
             
             # Check if we can continue training
-            last_weights_path = f"runs/detect/{latest_run}/weights/last.pt"
+            last_weights_path = f"{latest_dir.as_posix()}/weights/last.pt"
             if os.path.exists(last_weights_path):
                 print(f"✅ Found last checkpoint: {last_weights_path}")
                 
                 # Load the last weights to continue training
                 print(f"📥 Loading last weights: {last_weights_path}")
                 model = YOLO(last_weights_path)
+                model.add_callback("on_train_start", register_started_run)
                 
                 # Continue training in the same run directory
                 # Adjust batch size for CPU training
@@ -171,8 +172,8 @@ def train_model():
                         batch=batch_size,
                         patience=10,  # Early stopping
                         save=True,
-                        project="runs/detect",
-                        name=latest_run,
+                        project=latest_dir.parent.as_posix(),
+                        name=latest_dir.name,
                         resume=True,  # Resume from last checkpoint
                         device=device  # Use detected device (CPU/GPU)
                     )
@@ -184,7 +185,7 @@ def train_model():
                         print("🔄 Training appears to be marked as finished. Checking training state...")
                         
                         # Check if there's a training state file we can modify
-                        state_file = f"runs/detect/{latest_run}/train/results.csv"
+                        state_file = f"{latest_dir.as_posix()}/train/results.csv"
                         if os.path.exists(state_file):
                             print(f"📊 Found training results: {state_file}")
                             print("🔄 Attempting to continue training by setting higher epoch target...")
@@ -197,8 +198,8 @@ def train_model():
                                 batch=batch_size,
                                 patience=10,
                                 save=True,
-                                project="runs/detect",
-                                name=latest_run,
+                                project=latest_dir.parent.as_posix(),
+                                name=latest_dir.name,
                                 resume=True,  # Try resume again with higher epochs
                                 device=device
                             )
@@ -264,26 +265,19 @@ def train_model():
         
         print("✅ Training completed successfully!")
         
-        # Determine the actual run directory where training completed by scanning directories
+        # Record the run the trainer actually wrote to in the run registry
         final_dir = None
         try:
-            run_dirs = []
-            runs_root = Path("runs/detect")
-            if runs_root.exists():
-                for d in runs_root.iterdir():
-                    if d.is_dir() and d.name.startswith("fruit-detection"):
-                        run_dirs.append(d)
-            if run_dirs:
-                # Prefer highest numeric suffix; fall back to most recent mtime
-                def _run_index_dir(p: Path) -> int:
-                    s = p.name.replace("fruit-detection", "")
-                    return int(s) if s.isdigit() else 0
-                run_dirs.sort(key=_run_index_dir)
-                final_dir = run_dirs[-1]
-                # If same numeric order, pick most recently modified
-                final_dir = max(run_dirs, key=lambda p: p.stat().st_mtime)
-        except Exception:
-            final_dir = None
+            final_dir = Path(model.trainer.save_dir)
+            entry = run_registry.register_run(final_dir)
+            print(f"🗂️  Registered run {entry['name']} (epochs: {entry['epochs']}, metrics: {entry['metrics']})")
+        except Exception as e:
+            print(f"⚠️  Could not register run from trainer ({e}), rebuilding registry from runs/detect")
+            try:
+                run_registry.rebuild()
+                final_dir = run_registry.latest_run_dir()
+            except Exception:
+                final_dir = None
         final_path_str = (final_dir.as_posix() if final_dir else "runs/detect/fruit-detection") + "/weights/"
         print(f"📁 Model saved to: {final_path_str}")
         
@@ -300,37 +294,38 @@ def test_model(device="cpu"):
     try:
         from ultralytics import YOLO
         
-        # Find the latest trained model (numerically and by mtime)
-        runs_dir = Path("runs/detect")
-        existing_runs = []
-        if runs_dir.exists():
-            for run_dir in runs_dir.iterdir():
-                if run_dir.is_dir() and run_dir.name.startswith("fruit-detection"):
-                    existing_runs.append(run_dir)
-        def _run_index_dir(p: Path) -> int:
-            s = p.name.replace("fruit-detection", "")
-            return int(s) if s.isdigit() else 0
-        if existing_runs:
-            existing_runs.sort(key=_run_index_dir)
-            # then pick most recently modified among top
-            latest_dir = max(existing_runs, key=lambda p: p.stat().st_mtime)
-            latest_run = latest_dir.name
-        else:
-            latest_run = None
+        # Find the latest trained model in the run registry
+        latest_entry = run_registry.get_run('latest')
+        latest_run = latest_entry['name'] if latest_entry else None
         
         if not latest_run:
             print("❌ No trained models found")
             return False
         
         # Load trained model from the latest run
-        model_path = f"runs/detect/{latest_run}/weights/best.pt"
+        model_path = f"{Path(latest_entry['path']).as_posix()}/weights/best.pt"
         if not os.path.exists(model_path):
             print(f"❌ Trained model not found at: {model_path}")
             return False
         
+        # Evaluate on the whole val split (mAP per class + latency report)
+        from evaluate_model import DEFAULT_DATASET, evaluate, find_val_images, write_report
+        val_images = find_val_images(DEFAULT_DATASET)
+        if val_images:
+            print(f"🔍 Evaluating on {len(val_images)} val images...")
+            workers = 1 if device != "cpu" else max(1, min(4, os.cpu_count() or 1))
+            report = evaluate(model_path, val_images, device=device, workers=workers)
+            report_path = write_report(report)
+            latency = report['latency_ms']['end_to_end']
+            print(f"📊 mAP50: {report['metrics']['mAP50']:.3f}  mAP50-95: {report['metrics']['mAP50-95']:.3f}")
+            print(f"⏱️  Latency p50/p95: {latency['p50']:.1f}/{latency['p95']:.1f} ms per image")
+            print(f"📁 Evaluation report: {report_path}")
+            print("✅ Model testing completed!")
+            return True
+        
         model = YOLO(model_path)
         
-        # Test on a sample image (if available)
+        # No val split available: sanity-check on a sample image
         current_dir = Path(__file__).parent  # backend/
         project_root = current_dir.parent     # waste-wise-hazer/
         test_images = [
@@ -380,34 +375,21 @@ def copy_model_to_production():
     try:
         import shutil
         
-        # Find the latest trained model (numerically and by mtime)
-        runs_dir = Path("runs/detect")
-        existing_runs = []
-        if runs_dir.exists():
-            for run_dir in runs_dir.iterdir():
-                if run_dir.is_dir() and run_dir.name.startswith("fruit-detection"):
-                    existing_runs.append(run_dir)
-        def _run_index_dir(p: Path) -> int:
-            s = p.name.replace("fruit-detection", "")
-            return int(s) if s.isdigit() else 0
-        if existing_runs:
-            existing_runs.sort(key=_run_index_dir)
-            latest_dir = max(existing_runs, key=lambda p: p.stat().st_mtime)
-            latest_run = latest_dir.name
-        else:
-            latest_run = None
+        # Promote the best-scoring registered run (fall back to the latest)
+        entry = run_registry.get_run('best') or run_registry.get_run('latest')
         
-        if not latest_run:
+        if not entry:
             print("❌ No trained models found")
             return False
         
-        source_path = Path(f"runs/detect/{latest_run}/weights/best.pt")
+        source_path = Path(entry['path']) / "weights" / "best.pt"
         dest_path = Path("models/best.pt")
         
         if os.path.exists(source_path):
             os.makedirs("models", exist_ok=True)
             shutil.copy2(source_path, dest_path)
-            print(f"✅ Model copied to: {dest_path}")
+            run_registry.mark_promoted(entry['name'])
+            print(f"✅ Model copied to: {dest_path} (run: {entry['name']})")
             return True
         else:
             print(f"❌ Source model not found at: {source_path}")
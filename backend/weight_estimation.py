@@ -0,0 +1,104 @@
+"""
+Waste-weight estimation from detection boxes.
+
+Each detection is treated as an ellipsoid whose two visible axes are the
+box width and height and whose depth is the shorter of the two; its volume
+times a per-class density gives the mass. Boxes are converted from pixels
+to centimetres with a per-camera calibration (pixels per cm at the bin
+surface). Without a calibration the per-class typical mass is used. All
+tables are NumPy arrays indexed by class id, so a whole batch of boxes is
+estimated in a handful of vector operations.
+"""
+
+import json
+import os
+
+import numpy as np
+
+CALIBRATION_PATH = os.environ.get('CAMERA_CALIBRATION_PATH', 'camera_calibration.json')
+DEFAULT_PIXELS_PER_CM = float(os.environ.get('DEFAULT_PIXELS_PER_CM', '0')) or None
+
+# Per-class properties, in CLASS_NAMES order:
+# (density g/cm^3, typical mass kg, min mass kg, max mass kg)
+CLASS_PROPERTIES = {
+    "apple":        (0.80, 0.18, 0.05, 0.50),
+    "tangerine":    (0.90, 0.09, 0.03, 0.25),
+    "pear":         (0.98, 0.18, 0.06, 0.50),
+    "watermelon":   (0.96, 5.00, 1.00, 15.0),
+    "durian":       (0.90, 2.00, 0.80, 5.00),
+    "lemon":        (0.95, 0.10, 0.04, 0.30),
+    "grape":        (0.60, 0.50, 0.01, 1.50),  # bunches; low packing density
+    "pineapple":    (0.85, 1.50, 0.50, 3.50),
+    "dragon fruit": (0.95, 0.40, 0.15, 1.00),
+    "korean melon": (0.95, 0.50, 0.20, 1.20),
+    "cantaloupe":   (0.92, 1.50, 0.50, 4.00),
+}
+
+_ELLIPSOID = np.pi / 6.0
+
+
+def build_tables(class_names):
+    """Lookup arrays (density, typical, min, max) indexed by class id"""
+    fallback = (0.9, 0.2, 0.01, 5.0)
+    rows = np.array([CLASS_PROPERTIES.get(name, fallback) for name in class_names] + [fallback],
+                    dtype=np.float64)
+    # The extra last row serves class ids outside class_names
+    return rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
+
+
+def load_calibration(path=None):
+    """camera_id -> pixels per cm, from the calibration JSON file if present"""
+    path = path or CALIBRATION_PATH
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return {camera_id: float(entry['pixels_per_cm']) for camera_id, entry in data.items()}
+    except Exception as e:
+        print(f"Warning: could not read camera calibration {path}: {e}")
+        return {}
+
+
+class WeightEstimator:
+    """Vectorized bbox -> kilogram estimates with precomputed class tables"""
+
+    def __init__(self, class_names, calibration=None):
+        self.class_names = list(class_names)
+        self.density, self.typical_kg, self.min_kg, self.max_kg = build_tables(self.class_names)
+        self.calibration = load_calibration() if calibration is None else calibration
+
+    def pixels_per_cm(self, camera_id=None):
+        return self.calibration.get(camera_id, DEFAULT_PIXELS_PER_CM)
+
+    def estimate(self, class_ids, boxes, pixels_per_cm=None):
+        """
+        Estimated mass in kg for arrays of class ids (N,) and xyxy boxes (N, 4).
+
+        pixels_per_cm may be a scalar or an (N,) array so batches mixing
+        several cameras are handled in one call; None selects typical masses.
+        """
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        if class_ids.size == 0:
+            return np.zeros(0)
+        idx = np.where((class_ids >= 0) & (class_ids < len(self.class_names)), class_ids, len(self.class_names))
+        if pixels_per_cm is None:
+            return self.typical_kg[idx].copy()
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scale = np.asarray(pixels_per_cm, dtype=np.float64)
+        w = np.abs(boxes[:, 2] - boxes[:, 0]) / scale
+        h = np.abs(boxes[:, 3] - boxes[:, 1]) / scale
+        volume_cm3 = _ELLIPSOID * w * h * np.minimum(w, h)
+        mass_kg = volume_cm3 * self.density[idx] / 1000.0
+        return np.clip(mass_kg, self.min_kg[idx], self.max_kg[idx])
+
+    def annotate(self, detections, camera_id=None):
+        """Add 'estimated_kg' to each detection in place; returns the total in kg"""
+        if not detections:
+            return 0.0
+        class_ids = [d['class_id'] for d in detections]
+        boxes = [d['bbox'] for d in detections]
+        masses = self.estimate(class_ids, boxes, self.pixels_per_cm(camera_id))
+        for detection, mass in zip(detections, masses):
+            detection['estimated_kg'] = round(float(mass), 3)
+        return round(float(masses.sum()), 3)
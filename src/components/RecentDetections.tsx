@@ -1,6 +1,8 @@
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Camera, Clock } from "lucide-react";
+import { formatDistanceToNow } from "date-fns";
+import type { DetectionEvent } from "@/hooks/use-detection-events";
 
 const mockDetections = [
   {
@@ -40,13 +42,47 @@ const mockDetections = [
   },
 ];
 
-export const RecentDetections = () => {
+const describeItems = (classCounts: Record<string, number>) =>
+  Object.entries(classCounts)
+    .map(([name, count]) => (count > 1 ? `${count}× ${name}` : name))
+    .join(", ") || "No food detected";
+
+interface DetectionRow {
+  id: string | number;
+  item: string;
+  location: string;
+  time: string;
+  badge: string;
+}
+
+interface RecentDetectionsProps {
+  // Live detections from the event stream; the sample list is shown until one arrives
+  events?: DetectionEvent[];
+  live?: boolean;
+}
+
+export const RecentDetections = ({ events = [], live = false }: RecentDetectionsProps) => {
+  const detections: DetectionRow[] = events.length > 0
+    ? events.map((event, index) => ({
+        id: `${event.received_at}-${index}`,
+        item: describeItems(event.class_counts),
+        location: event.camera_id ?? (event.source === "upload" ? "Manual upload" : "Camera capture"),
+        time: formatDistanceToNow(event.received_at, { addSuffix: true }),
+        badge: `${event.estimated_total_kg.toFixed(2)} kg`,
+      }))
+    : mockDetections.map((detection) => ({ ...detection, badge: `${detection.confidence}%` }));
+
   return (
     <Card>
       <CardHeader>
         <CardTitle className="flex items-center gap-2">
           <Camera className="h-5 w-5 text-primary" />
           Recent Detections
+          {live && (
+            <Badge variant="outline" className="text-xs">
+              Live
+            </Badge>
+          )}
         </CardTitle>
         <CardDescription>
           Latest food waste items detected by Hazer cameras
@@ -54,13 +90,13 @@ export const RecentDetections = () => {
       </CardHeader>
       <CardContent>
         <div className="space-y-4">
-          {mockDetections.map((detection) => (
+          {detections.map((detection) => (
             <div key={detection.id} className="flex items-center justify-between p-3 rounded-lg bg-muted/50 hover:bg-muted transition-colors">
               <div className="flex-1">
                 <div className="flex items-center gap-2 mb-1">
                   <span className="font-medium text-sm">{detection.item}</span>
                   <Badge variant="secondary" className="text-xs">
-                    {detection.confidence}%
+                    {detection.badge}
                   </Badge>
                 </div>
                 <div className="flex items-center gap-1 text-xs text-muted-foreground">
@@ -0,0 +1,57 @@
+import * as React from "react"
+
+const MAX_RECENT_DETECTIONS = 20
+// The SSE stream is served by the event server (backend/events.py); the Vite dev server proxies /api/events to it
+const EVENTS_BASE_URL = import.meta.env.VITE_EVENTS_URL ?? ""
+
+export interface DetectionEvent {
+  source: "upload" | "camera"
+  camera_id: string | null
+  total_detections: number
+  class_counts: Record<string, number>
+  estimated_total_kg: number
+  new_items: unknown[] | null
+  received_at: number
+}
+
+export interface MetricsTotals {
+  total_detections: number
+  total_waste_kg: number
+  class_counts: Record<string, number>
+}
+
+export function useDetectionEvents(topics: string[] = ["detection", "metrics"]) {
+  const [recent, setRecent] = React.useState<DetectionEvent[]>([])
+  const [metrics, setMetrics] = React.useState<MetricsTotals>({ total_detections: 0, total_waste_kg: 0, class_counts: {} })
+  const [connected, setConnected] = React.useState(false)
+  const topicKey = topics.join(",")
+
+  React.useEffect(() => {
+    const source = new EventSource(`${EVENTS_BASE_URL}/api/events?topics=${encodeURIComponent(topicKey)}`)
+
+    source.addEventListener("hello", () => setConnected(true))
+    source.addEventListener("detection", (e) => {
+      const event = { ...JSON.parse((e as MessageEvent).data), received_at: Date.now() } as DetectionEvent
+      setRecent((prev) => [event, ...prev].slice(0, MAX_RECENT_DETECTIONS))
+    })
+    source.addEventListener("metrics", (e) => {
+      const delta = JSON.parse((e as MessageEvent).data) as Partial<MetricsTotals>
+      setMetrics((prev) => {
+        const class_counts = { ...prev.class_counts }
+        for (const [name, count] of Object.entries(delta.class_counts ?? {})) {
+          class_counts[name] = (class_counts[name] ?? 0) + count
+        }
+        return {
+          total_detections: prev.total_detections + (delta.total_detections ?? 0),
+          total_waste_kg: prev.total_waste_kg + (delta.total_waste_kg ?? 0),
+          class_counts,
+        }
+      })
+    })
+    source.onerror = () => setConnected(false)
+
+    return () => source.close()
+  }, [topicKey])
+
+  return { recent, metrics, connected }
+}
@@ -0,0 +1,19 @@
+// Alert thresholds for each food type
+export const alertThresholds: Record<string, number> = {
+  "apple": 5,
+  "tangerine": 4,
+  "pear": 3,
+  "watermelon": 2,
+  "durian": 2,
+  "lemon": 6,
+  "grape": 8,
+  "pineapple": 3,
+  "dragon fruit": 2,
+  "korean melon": 2,
+  "cantaloupe": 2
+};
+
+export const DEFAULT_ALERT_THRESHOLD = 10;
+
+export const alertThresholdFor = (className: string) =>
+  alertThresholds[className.toLowerCase()] || DEFAULT_ALERT_THRESHOLD;
@@ -9,6 +9,7 @@ import { useToast } from "@/hooks/use-toast";
 import { Header } from "@/components/Header";
 import CameraCapture from "@/components/CameraCapture";
 import FoodAlert from "@/components/FoodAlert";
+import { alertThresholdFor } from "@/lib/alert-thresholds";
 
 interface DetectionResult {
   class_id: number;
@@ -30,21 +31,6 @@ const classNames = [
   "🍋 lemon", "🍇 grape", "🍍 pineapple", "🐉 dragon fruit", "🍈 korean melon", "🍈 cantaloupe"
 ];
 
-// Alert thresholds for each food type
-const alertThresholds: Record<string, number> = {
-  "apple": 5,
-  "tangerine": 4,
-  "pear": 3,
-  "watermelon": 2,
-  "durian": 2,
-  "lemon": 6,
-  "grape": 8,
-  "pineapple": 3,
-  "dragon fruit": 2,
-  "korean melon": 2,
-  "cantaloupe": 2
-};
-
 const FoodDetection = () => {
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [previewUrl, setPreviewUrl] = useState<string | null>(null);
@@ -320,7 +306,7 @@ const FoodDetection = () => {
                   <CardContent>
                     <div className="space-y-3">
                       {Object.entries(results.class_counts).map(([className, count]) => {
-                        const threshold = alertThresholds[className.toLowerCase()] || 10;
+                        const threshold = alertThresholdFor(className);
                         const isHighQuantity = count >= threshold;
                         
                         return (
@@ -343,7 +329,7 @@ const FoodDetection = () => {
 
                 {/* Food Alerts */}
                 {Object.entries(results.class_counts).map(([className, count]) => {
-                  const threshold = alertThresholds[className.toLowerCase()] || 10;
+                  const threshold = alertThresholdFor(className);
                   if (count >= threshold) {
                     return (
                       <FoodAlert
@@ -3,9 +3,20 @@ import { FoodWasteChart } from "@/components/FoodWasteChart";
 import { RecentDetections } from "@/components/RecentDetections";
 import { LocationMap } from "@/components/LocationMap";
 import { Header } from "@/components/Header";
+import FoodAlert from "@/components/FoodAlert";
+import { useDetectionEvents } from "@/hooks/use-detection-events";
+import { alertThresholdFor } from "@/lib/alert-thresholds";
 import { TrendingDown, TrendingUp, Camera, MapPin, Recycle, AlertTriangle } from "lucide-react";
 
 const Index = () => {
+  const { recent, metrics, connected } = useDetectionEvents();
+  const classCounts = Object.entries(metrics.class_counts);
+  const [mostWasted, mostWastedCount] = classCounts.reduce(
+    (best, entry) => (entry[1] > best[1] ? entry : best),
+    ["", 0] as [string, number]
+  );
+  const hasLiveMetrics = metrics.total_detections > 0;
+
   return (
     <div className="min-h-screen bg-background">
       <Header />
@@ -15,15 +26,17 @@ const Index = () => {
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-8">
           <MetricsCard
             title="Total Waste Detected"
-            value="47.2 kg"
-            change="-12% from last week"
-            changeType="positive"
+            value={hasLiveMetrics ? `${metrics.total_waste_kg.toFixed(1)} kg` : "47.2 kg"}
+            change={hasLiveMetrics ? `${metrics.total_detections} items this session` : "-12% from last week"}
+            changeType={hasLiveMetrics ? "neutral" : "positive"}
             icon={Recycle}
           />
           <MetricsCard
             title="Most Wasted Item"
-            value="Vegetables"
-            change="25% of total waste"
+            value={hasLiveMetrics ? mostWasted : "Vegetables"}
+            change={hasLiveMetrics
+              ? `${Math.round((100 * mostWastedCount) / metrics.total_detections)}% of items this session`
+              : "25% of total waste"}
             changeType="neutral"
             icon={TrendingUp}
           />
@@ -43,10 +56,19 @@ const Index = () => {
           />
         </div>
 
+        {/* Live alerts for classes over their threshold this session */}
+        {classCounts
+          .filter(([className, count]) => count >= alertThresholdFor(className))
+          .map(([className, count]) => (
+            <div key={`alert-${className}`} className="mb-8">
+              <FoodAlert className={className} count={count} threshold={alertThresholdFor(className)} />
+            </div>
+          ))}
+
         {/* Charts and Analytics */}
         <div className="grid grid-cols-1 lg:grid-cols-3 gap-6 mb-8">
           <FoodWasteChart />
-          <RecentDetections />
+          <RecentDetections events={recent} live={connected} />
         </div>
 
         {/* UAE Network Map */}
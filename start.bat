@@ -45,6 +45,10 @@ REM Start Flask server in background
 echo 🚀 Starting Flask server on http://localhost:5000
 start "Backend Server" python app.py
 
+REM Start the live-updates (SSE) event server
+echo 📡 Starting event server on http://localhost:5001
+start "Event Server" python events.py
+
 cd ..
 
 REM Wait a moment for backend to start
@@ -68,6 +72,7 @@ echo 🎉 Both servers are starting up!
 echo ================================
 echo 🌐 Frontend: http://localhost:8080
 echo 🐍 Backend:  http://localhost:5000
+echo 📡 Events:   http://localhost:5001/api/events
 echo 📊 Health:   http://localhost:5000/api/health
 echo.
 echo Both servers are now running in separate windows.